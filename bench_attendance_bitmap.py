@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Compare storage and read speed of Attendance rows with the packed monthly day statuses"""
+import os
+import sys
+import random
+import time
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'garments.settings')
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Run against a throwaway in-memory database, never the real one
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = ':memory:'
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+
+from gate import daybits
+from gate.attendance import rebuild_summaries
+from gate.models import Attendance, AttendanceMonthlySummary, Department, Employee
+
+EMPLOYEES = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+MONTHS = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+START = date(2025, 1, 1)
+STATUS_WEIGHTS = {'P': 80, 'A': 6, 'L': 6, 'H': 4, 'WFH': 4}
+
+
+def table_bytes(table):
+    """Bytes used by a table and its indexes"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE tbl_name = %s)", [table]
+        )
+        return cursor.fetchone()[0] or 0
+
+
+call_command('migrate', verbosity=0)
+
+random.seed(42)
+department = Department.objects.create(name='Benchmark')
+Employee.objects.bulk_create([
+    Employee(
+        employee_id=f"B{number:06d}", first_name='Bench', last_name=str(number),
+        email=f"bench{number}@example.com", date_of_birth=date(1990, 1, 1), gender='M',
+        department=department, designation='Operator', date_of_joining=START,
+        address='-', city='-', state='-', postal_code='-',
+    )
+    for number in range(EMPLOYEES)
+], batch_size=1000)
+employee_ids = list(Employee.objects.values_list('pk', flat=True))
+
+statuses, weights = zip(*STATUS_WEIGHTS.items())
+end = START
+for _ in range(MONTHS):
+    end = (end.replace(day=28) + timedelta(days=4)).replace(day=1)
+days = [START + timedelta(days=offset) for offset in range((end - START).days)]
+days = [day for day in days if day.weekday() != 6]
+batch = []
+for day in days:
+    for employee_id, status in zip(employee_ids, random.choices(statuses, weights, k=len(employee_ids))):
+        batch.append(Attendance(employee_id=employee_id, date=day, status=status))
+        if len(batch) == 10000:
+            Attendance.objects.bulk_create(batch)
+            batch = []
+Attendance.objects.bulk_create(batch)
+
+started = time.perf_counter()
+summaries = rebuild_summaries()
+rebuild_time = time.perf_counter() - started
+
+print('=' * 60)
+print(f'ATTENDANCE BITMAP BENCHMARK - {EMPLOYEES:,} employees x {MONTHS} months')
+print('=' * 60)
+
+rows = Attendance.objects.count()
+row_bytes = table_bytes(Attendance._meta.db_table)
+summary_bytes = table_bytes(AttendanceMonthlySummary._meta.db_table)
+print(f'Attendance rows       : {rows:>12,} ({row_bytes / 1024 / 1024:,.1f} MiB with indexes)')
+print(f'Monthly summaries     : {summaries:>12,} ({summary_bytes / 1024 / 1024:,.1f} MiB with indexes)')
+print(f'Packed day statuses   : {summaries * daybits.BLOB_SIZE / 1024 / 1024:>12,.2f} MiB')
+print(f'Size reduction        : {row_bytes / summary_bytes:>12.1f}x')
+print(f'Summary rebuild       : {rebuild_time:>12.3f}s')
+
+# Read every employee's calendar for every month both ways, checking they agree
+started = time.perf_counter()
+from_rows = {}
+for employee_id, day, status in Attendance.objects.values_list('employee_id', 'date', 'status').order_by().iterator(chunk_size=10000):
+    from_rows.setdefault((employee_id, f"{day.year}-{day.month:02d}"), {})[day.day] = status
+row_time = time.perf_counter() - started
+
+started = time.perf_counter()
+from_bits = {}
+for employee_id, month, blob in AttendanceMonthlySummary.objects.values_list('employee_id', 'month', 'day_statuses').iterator(chunk_size=10000):
+    from_bits[(employee_id, month)] = daybits.decode(blob)
+bits_time = time.perf_counter() - started
+
+mismatches = sum(1 for key in from_rows.keys() | from_bits.keys() if from_rows.get(key) != from_bits.get(key))
+print(f'Read from rows        : {row_time:>12.3f}s')
+print(f'Read from bitmaps     : {bits_time:>12.3f}s')
+print(f'Read speedup          : {row_time / bits_time:>12.1f}x')
+print(f'Mismatched months     : {mismatches:>12}')
+print('=' * 60)
+sys.exit(1 if mismatches else 0)
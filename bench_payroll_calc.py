@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Compare the per-object Decimal payroll path with the vectorized paise calculator"""
+import os
+import sys
+import random
+import time
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'garments.settings')
+sys.path.insert(0, os.path.dirname(__file__))
+django.setup()
+
+from gate import payroll_calc
+from gate.models import PayrollRecord
+from gate.payroll_calc import DEDUCTION_FIELDS, EARNING_FIELDS
+
+EMPLOYEES = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+WORKING_DAYS = 22
+
+if not payroll_calc.is_available():
+    sys.exit('NumPy is not installed, the vectorized calculator is unavailable')
+
+
+def amount(low, high):
+    return Decimal(random.randint(low * 100, high * 100)).scaleb(-2)
+
+
+random.seed(42)
+inputs = []
+for employee_id in range(1, EMPLOYEES + 1):
+    row = {'employee_id': employee_id, 'present_days': random.randint(0, WORKING_DAYS)}
+    row.update({field: amount(0, 40000) for field in EARNING_FIELDS})
+    row.update({field: amount(0, 5000) for field in DEDUCTION_FIELDS})
+    inputs.append(row)
+
+print('=' * 60)
+print(f'PAYROLL CALCULATOR BENCHMARK - {EMPLOYEES:,} employees')
+print('=' * 60)
+
+# Per-object Decimal path
+started = time.perf_counter()
+expected = []
+for row in inputs:
+    record = PayrollRecord(**{field: row[field] for field in EARNING_FIELDS + DEDUCTION_FIELDS})
+    record.calculate_salary()
+    expected.append((
+        record.gross_salary,
+        record.total_deductions,
+        record.net_salary,
+        payroll_calc.prorate(record.net_salary, row['present_days'], WORKING_DAYS),
+    ))
+decimal_time = time.perf_counter() - started
+
+# Vectorized paise path
+started = time.perf_counter()
+totals = payroll_calc.calculate_batch(inputs, WORKING_DAYS)
+vector_time = time.perf_counter() - started
+
+actual = zip(
+    *(map(payroll_calc.from_paise, totals[key]) for key in
+      ('gross_salary', 'total_deductions', 'net_salary', 'prorated_net_salary'))
+)
+mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+
+print(f'Decimal per-object : {decimal_time:8.3f}s')
+print(f'Vectorized (paise) : {vector_time:8.3f}s')
+print(f'Speedup            : {decimal_time / vector_time:8.1f}x')
+print(f'Mismatched rows    : {mismatches}')
+print('=' * 60)
+sys.exit(1 if mismatches else 0)
@@ -77,6 +77,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than memory, so payroll pool workers can read it in tests
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -126,3 +128,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Working days
+# Weekday numbers (Monday is 0) treated as weekly offs, in addition to HolidayCalendar
+GATE_WEEKLY_OFFS = [6]
+
+# Shifts as (start HH:MM, length in hours); each attendance day is matched to
+# the shift starting nearest its check-in. Time worked past the shift length
+# is overtime, arriving more than the grace minutes after the start is late.
+# Rerun rebuild_attendance_summaries after changing these.
+GATE_SHIFTS = [('09:00', 8), ('21:00', 8)]
+GATE_LATE_GRACE_MINUTES = 10
+
+# Leave days credited to every active employee each month by accrue_leave, per
+# leave type; earned leave (EL) instead accrues a day per this many days worked
+GATE_LEAVE_ACCRUALS = {'SL': '1.00', 'CL': '0.83'}
+GATE_EARNED_LEAVE_WORK_DAYS = 20
+
+# Rendered salary slip PDFs, stored by content hash
+SALARY_SLIP_DIR = BASE_DIR / 'media' / 'salary_slips'
+
+# Token biometric/turnstile devices send as "Authorization: Token <key>" when
+# posting punches; leave empty to accept punches from staff sessions only
+GATE_PUNCH_API_KEY = ''
@@ -1,8 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
+from .leaves import decide_leaves, post_entries
 from .models import (
     Department, Employee, SalaryStructure, Attendance, Leave, 
-    PayrollMonth, PayrollRecord, SalarySlip, Deduction, HolidayCalendar
+    PayrollMonth, PayrollRecord, SalarySlip, Deduction, HolidayCalendar,
+    PayrollJob, DeductionInstallment, PunchEvent, AttendanceMonthlySummary,
+    AttendanceAnomaly, LeaveLedgerEntry, LeaveBalance
 )
 
 @admin.register(Department)
@@ -96,6 +99,35 @@ class AttendanceAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
 
 
+@admin.register(AttendanceMonthlySummary)
+class AttendanceMonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'month', 'present_days', 'absent_days', 'leave_days', 'half_days', 'wfh_days', 'worked_hours', 'overtime_hours', 'late_days', 'updated_at')
+    list_filter = ('month', 'employee__department')
+    search_fields = ('employee__employee_id', 'employee__first_name', 'employee__last_name')
+    readonly_fields = ('updated_at',)
+    ordering = ('-month', 'employee')
+
+
+@admin.register(PunchEvent)
+class PunchEventAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'punched_at', 'device_id', 'event_id', 'created_at')
+    list_filter = ('device_id', 'date')
+    search_fields = ('employee__employee_id', 'device_id', 'event_id')
+    raw_id_fields = ('employee',)
+    readonly_fields = ('created_at',)
+    date_hierarchy = 'date'
+
+
+@admin.register(AttendanceAnomaly)
+class AttendanceAnomalyAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'date', 'kind', 'detail', 'detected_at')
+    list_filter = ('kind', 'month')
+    search_fields = ('employee__employee_id', 'employee__first_name', 'employee__last_name')
+    raw_id_fields = ('employee',)
+    readonly_fields = ('detected_at',)
+    ordering = ('-date', 'employee')
+
+
 @admin.register(Leave)
 class LeaveAdmin(admin.ModelAdmin):
     list_display = ('employee', 'leave_type', 'start_date', 'end_date', 'number_of_days', 'status_badge')
@@ -110,6 +142,25 @@ class LeaveAdmin(admin.ModelAdmin):
         }),
     )
     readonly_fields = ('created_at', 'updated_at', 'number_of_days')
+    actions = ('approve_selected', 'reject_selected')
+    
+    def _decide(self, request, queryset, action):
+        results = decide_leaves(queryset.values_list('pk', flat=True), action, request.user)
+        decided = sum(1 for result in results if result['result'] != 'skipped')
+        verb = 'approved' if action == 'approve' else 'rejected'
+        self.message_user(request, f"{decided} leave(s) {verb}")
+        skipped = [result for result in results if result['result'] == 'skipped']
+        if skipped:
+            details = '; '.join(f"#{result['id']} {result['detail']}" for result in skipped[:10])
+            self.message_user(request, f"{len(skipped)} skipped: {details}", messages.WARNING)
+    
+    @admin.action(description='Approve selected pending leaves')
+    def approve_selected(self, request, queryset):
+        self._decide(request, queryset, 'approve')
+    
+    @admin.action(description='Reject selected pending leaves')
+    def reject_selected(self, request, queryset):
+        self._decide(request, queryset, 'reject')
     
     def status_badge(self, obj):
         colors = {
@@ -125,6 +176,37 @@ class LeaveAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
 
 
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'leave_type', 'kind', 'days', 'leave', 'period', 'note', 'created_at')
+    list_filter = ('kind', 'leave_type', 'period')
+    search_fields = ('employee__employee_id', 'employee__first_name', 'employee__last_name')
+    raw_id_fields = ('employee', 'leave')
+    readonly_fields = ('created_at',)
+    
+    def has_change_permission(self, request, obj=None):
+        # The ledger is append-only; corrections are new adjustment entries
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def save_model(self, request, obj, form, change):
+        post_entries([obj])
+
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'leave_type', 'balance', 'updated_at')
+    list_filter = ('leave_type',)
+    search_fields = ('employee__employee_id', 'employee__first_name', 'employee__last_name')
+    readonly_fields = ('employee', 'leave_type', 'balance', 'updated_at')
+    
+    def has_add_permission(self, request):
+        # Balances only move through the ledger
+        return False
+
+
 @admin.register(PayrollMonth)
 class PayrollMonthAdmin(admin.ModelAdmin):
     list_display = ('month', 'year', 'status', 'processing_date', 'payment_date')
@@ -145,6 +227,14 @@ class PayrollMonthAdmin(admin.ModelAdmin):
     ordering = ('-year', '-month')
 
 
+@admin.register(PayrollJob)
+class PayrollJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'payroll_month', 'status', 'processed', 'total', 'attempts', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'payroll_month')
+    readonly_fields = ('processed', 'total', 'attempts', 'result', 'error', 'started_at', 'finished_at', 'created_at', 'updated_at')
+    ordering = ('-created_at',)
+
+
 @admin.register(PayrollRecord)
 class PayrollRecordAdmin(admin.ModelAdmin):
     list_display = ('employee', 'payroll_month', 'gross_salary_display', 'total_deductions_display', 'net_salary_display')
@@ -161,7 +251,7 @@ class PayrollRecordAdmin(admin.ModelAdmin):
             'fields': ('basic_salary', 'hra', 'dearness_allowance', 'conveyance', 'medical_allowance', 'other_allowances', 'gross_salary')
         }),
         ('Deductions', {
-            'fields': ('pf_contribution', 'esi_contribution', 'income_tax', 'other_deductions', 'total_deductions')
+            'fields': ('pf_contribution', 'esi_contribution', 'income_tax', 'other_deductions', 'installment_deductions', 'total_deductions')
         }),
         ('Net Salary', {
             'fields': ('net_salary',)
@@ -211,6 +301,13 @@ class SalarySlipAdmin(admin.ModelAdmin):
     pdf_status.short_description = 'PDF Status'
 
 
+class DeductionInstallmentInline(admin.TabularInline):
+    model = DeductionInstallment
+    extra = 0
+    can_delete = False
+    readonly_fields = ('payroll_month', 'amount', 'created_at')
+
+
 @admin.register(Deduction)
 class DeductionAdmin(admin.ModelAdmin):
     list_display = ('employee', 'deduction_type', 'amount', 'from_date', 'to_date', 'is_active')
@@ -234,6 +331,7 @@ class DeductionAdmin(admin.ModelAdmin):
         }),
     )
     readonly_fields = ('created_at', 'updated_at')
+    inlines = [DeductionInstallmentInline]
 
 
 @admin.register(HolidayCalendar)
@@ -0,0 +1,83 @@
+import bisect
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import hours, workdays
+from .models import Attendance, AttendanceAnomaly, Leave, PunchEvent
+from .payroll import BATCH_SIZE, LEAVE_STATUSES, month_bounds, parse_month
+
+
+def _approved_leaves(month_start, month_end):
+    """``{employee_id: (starts, ends, ids)}`` of approved leaves overlapping a month, sorted by start"""
+    leaves = Leave.objects.filter(
+        status='A', start_date__lte=month_end, end_date__gte=month_start,
+    ).values_list('employee_id', 'start_date', 'end_date', 'pk').order_by('employee_id', 'start_date')
+    by_employee = defaultdict(lambda: ([], [], []))
+    for employee_id, start, end, leave_id in leaves:
+        starts, ends, ids = by_employee[employee_id]
+        starts.append(start)
+        ends.append(end)
+        ids.append(leave_id)
+    return by_employee
+
+
+def _covering_leave(intervals, day):
+    """Id of a leave covering ``day``, or None"""
+    starts, ends, ids = intervals
+    # Leaves of one employee can overlap, so walk back over every leave started by then
+    for index in range(bisect.bisect_right(starts, day) - 1, -1, -1):
+        if ends[index] >= day:
+            return ids[index]
+    return None
+
+
+def scan_month(month):
+    """Unsaved AttendanceAnomaly rows for every employee in a YYYY-MM month
+
+    Reads the month's attendance, punch days and approved leaves in one query
+    each and joins them in memory.
+    """
+    month_start, month_end = month_bounds(*parse_month(month))
+    policy = hours.ShiftPolicy.from_settings()
+    company_holidays = workdays.holidays()
+    punched = set(
+        PunchEvent.objects.filter(date__range=[month_start, month_end])
+        .values_list('employee_id', 'date').distinct().order_by()
+    )
+    leaves = _approved_leaves(month_start, month_end)
+    records = Attendance.objects.filter(date__range=[month_start, month_end]).values_list(
+        'employee_id', 'date', 'status', 'check_in_time', 'check_out_time'
+    ).order_by('employee_id', 'date')
+
+    found = []
+
+    def flag(employee_id, day, kind, detail=''):
+        found.append(AttendanceAnomaly(
+            employee_id=employee_id, month=month, date=day, kind=kind, detail=detail,
+        ))
+
+    for employee_id, day, status, check_in, check_out in records.iterator(chunk_size=5000):
+        if check_in is not None and check_out is None:
+            flag(employee_id, day, 'NO_OUT', f"In at {check_in:%H:%M}")
+        elif (check_in is not None and check_out < check_in
+              and not hours.crosses_midnight(check_in, policy)):
+            flag(employee_id, day, 'OUT_BEFORE_IN', f"In at {check_in:%H:%M}, out at {check_out:%H:%M}")
+        if status == 'P' and (employee_id, day) not in punched:
+            flag(employee_id, day, 'NO_PUNCH')
+        if day in company_holidays:
+            flag(employee_id, day, 'HOLIDAY', f"{company_holidays[day]}, marked {status}")
+        if status not in LEAVE_STATUSES and employee_id in leaves:
+            leave_id = _covering_leave(leaves[employee_id], day)
+            if leave_id is not None:
+                flag(employee_id, day, 'ON_LEAVE', f"Leave #{leave_id}, marked {status}")
+    return found
+
+
+def store_month(month):
+    """Replace a month's anomaly report with a fresh scan; returns the anomalies found"""
+    found = scan_month(month)
+    with transaction.atomic():
+        AttendanceAnomaly.objects.filter(month=month).delete()
+        AttendanceAnomaly.objects.bulk_create(found, batch_size=BATCH_SIZE)
+    return found
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def repair_search(sender, using, **kwargs):
+    """Migrations that rebuild gate_employee drop the search index triggers"""
+    from django.db import connections
+
+    from .search import repair
+    repair(connections[using])
 
 
 class GateConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gate'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(repair_search, sender=self)
@@ -0,0 +1,445 @@
+import calendar
+import csv
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from . import daybits, hours, workdays
+from .exports import Echo
+from .models import Attendance, AttendanceMonthlySummary, Employee, PunchEvent
+from .payroll import (
+    BATCH_SIZE, LEAVE_STATUSES, as_date, mark_payroll_dirty, month_bounds, month_key,
+    months_between, parse_month
+)
+from .pagination import keyset_iterator
+
+STATUS_CODES = {code for code, label in Attendance.STATUS_CHOICES}
+
+# Summary count fields and the attendance statuses each one counts
+SUMMARY_STATUSES = {
+    'present_days': ['P'],
+    'absent_days': ['A'],
+    'leave_days': LEAVE_STATUSES,
+    'half_days': ['H'],
+    'wfh_days': ['WFH'],
+}
+SUMMARY_FIELDS = list(SUMMARY_STATUSES) + ['day_statuses'] + hours.HOURS_FIELDS
+
+# Newest first; unique, so it can drive keyset pagination
+REPORT_ORDERING = ['-date', '-id']
+
+# Rows fetched per query while streaming a report export
+EXPORT_CHUNK_SIZE = 2000
+
+# Seconds a day's cached status counts live; writes refresh them sooner, this
+# only bounds staleness when each process has its own (local memory) cache
+DAY_COUNTS_TIMEOUT = 60
+
+REPORT_HEADER = [
+    'Date', 'Employee ID', 'Employee Name', 'Status', 'Check-In', 'Check-Out', 'Remarks',
+]
+
+
+def build_summary(employee_id, month, day_statuses, now=None, totals=None):
+    """Summary row for an employee-month from its ``{day_of_month: status}`` mapping
+
+    ``totals`` are the month's hours.HOURS_FIELDS, zero when not given.
+    """
+    counts = Counter(day_statuses.values())
+    return AttendanceMonthlySummary(
+        employee_id=employee_id,
+        month=month,
+        day_statuses=daybits.encode(day_statuses),
+        updated_at=now or timezone.now(),
+        **{
+            field: sum(counts[status] for status in statuses)
+            for field, statuses in SUMMARY_STATUSES.items()
+        },
+        **(totals or hours.empty_totals())
+    )
+
+
+def refresh_summaries(pairs, existing_only=False):
+    """Rebuild the monthly summaries of (employee_id, YYYY-MM) pairs from their rows
+
+    Each month touched costs one read of its attendance and one upsert (plus a
+    delete when an employee-month lost all its rows), however many employees it
+    covers. ``existing_only`` skips employees that no longer exist.
+    """
+    employees_by_month = defaultdict(set)
+    for employee_id, month in pairs:
+        employees_by_month[month].add(employee_id)
+    if existing_only:
+        existing = set(Employee.objects.filter(
+            pk__in=set().union(*employees_by_month.values())
+        ).values_list('pk', flat=True))
+        employees_by_month = {
+            month: employee_ids & existing for month, employee_ids in employees_by_month.items()
+        }
+
+    now = timezone.now()
+    policy = hours.ShiftPolicy.from_settings()
+    rows = []
+    for month, employee_ids in employees_by_month.items():
+        month_start, month_end = month_bounds(*parse_month(month))
+        days = {employee_id: {} for employee_id in employee_ids}
+        totals = {employee_id: hours.empty_totals() for employee_id in employee_ids}
+        records = Attendance.objects.filter(
+            employee_id__in=employee_ids,
+            date__range=[month_start, month_end],
+        ).values_list('employee_id', 'date', 'status', 'check_in_time', 'check_out_time').order_by()
+        for employee_id, day, status, check_in, check_out in records:
+            days[employee_id][day.day] = status
+            hours.add_day(totals[employee_id], check_in, check_out, policy)
+        rows.extend(
+            build_summary(employee_id, month, day_statuses, now, totals[employee_id])
+            for employee_id, day_statuses in days.items() if day_statuses
+        )
+        # Months left without attendance have no summary, as after a rebuild
+        empty = [employee_id for employee_id, day_statuses in days.items() if not day_statuses]
+        if empty:
+            AttendanceMonthlySummary.objects.filter(month=month, employee_id__in=empty).delete()
+    AttendanceMonthlySummary.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['employee', 'month'],
+        update_fields=SUMMARY_FIELDS + ['updated_at'],
+    )
+
+
+def rebuild_summaries(month=None):
+    """Recreate monthly summaries from raw attendance, for one YYYY-MM month or all
+
+    Returns the number of summary rows written.
+    """
+    records = Attendance.objects.all()
+    summaries = AttendanceMonthlySummary.objects.all()
+    if month is not None:
+        records = records.filter(date__range=month_bounds(*parse_month(month)))
+        summaries = summaries.filter(month=month)
+    records = records.values_list(
+        'employee_id', 'date', 'status', 'check_in_time', 'check_out_time'
+    ).order_by('employee_id', 'date')
+
+    now = timezone.now()
+    policy = hours.ShiftPolicy.from_settings()
+    written = 0
+    with transaction.atomic():
+        summaries.delete()
+        batch = []
+        current, day_statuses, totals = None, {}, None
+        for employee_id, day, status, check_in, check_out in records.iterator(chunk_size=5000):
+            key = (employee_id, month_key(day))
+            if key != current:
+                if current is not None:
+                    batch.append(build_summary(*current, day_statuses, now, totals))
+                current, day_statuses, totals = key, {}, hours.empty_totals()
+            day_statuses[day.day] = status
+            hours.add_day(totals, check_in, check_out, policy)
+            if len(batch) == BATCH_SIZE:
+                AttendanceMonthlySummary.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if current is not None:
+            batch.append(build_summary(*current, day_statuses, now, totals))
+        AttendanceMonthlySummary.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def month_statuses(employee, year, month):
+    """``{date: status}`` for an employee's month, decoded from its summary"""
+    blob = AttendanceMonthlySummary.objects.filter(
+        employee=employee, month=f"{year}-{month:02d}"
+    ).values_list('day_statuses', flat=True).first()
+    return {
+        date(year, month, day): status
+        for day, status in daybits.decode(blob).items()
+    }
+
+
+def department_heatmap(department, year, month):
+    """Employees x days status matrix of a department's month, for the heatmap API
+
+    Rows are strings with one daybits code digit per day, read from the packed
+    monthly summaries of every active employee in a single query.
+    """
+    days = calendar.monthrange(year, month)[1]
+    blobs = AttendanceMonthlySummary.objects.filter(
+        employee=OuterRef('pk'), month=f"{year}-{month:02d}"
+    ).values('day_statuses')[:1]
+    employees = list(
+        Employee.objects.filter(department=department, status='A')
+        .annotate(day_statuses=Subquery(blobs))
+        .order_by('employee_id')
+        .values_list('pk', 'employee_id', 'first_name', 'last_name', 'day_statuses')
+    )
+    mask = workdays.working_day_mask(year, month)
+    return {
+        'department': {'id': department.pk, 'name': department.name},
+        'month': f"{year}-{month:02d}",
+        'days': days,
+        'working_days': ''.join(str(mask >> day & 1) for day in range(days)),
+        'codes': {str(code): status for code, status in enumerate(daybits.STATUSES) if status},
+        'employees': [
+            [pk, employee_id, f"{first_name} {last_name}"]
+            for pk, employee_id, first_name, last_name, blob in employees
+        ],
+        'rows': daybits.code_rows([row[-1] for row in employees], days),
+    }
+
+
+def status_counts_between(start_date, end_date, employee_ids=None):
+    """Counter of attendance statuses in an inclusive date range, from the summaries"""
+    first_month, last_month = month_key(start_date), month_key(end_date)
+    summaries = AttendanceMonthlySummary.objects.filter(
+        month__in=months_between(start_date, end_date)
+    )
+    if employee_ids is not None:
+        summaries = summaries.filter(employee_id__in=employee_ids)
+    counts = Counter()
+    for month, blob in summaries.values_list('month', 'day_statuses').iterator(chunk_size=5000):
+        first_day = start_date.day if month == first_month else 1
+        last_day = end_date.day if month == last_month else daybits.MAX_DAYS
+        counts.update(daybits.count(blob, first_day, last_day))
+    return counts
+
+
+def _day_counts_key(day):
+    return f"gate:attendance-counts:{day.isoformat()}"
+
+
+def count_statuses(days):
+    """Attendance count per status code, plus ``total``, for each of ``days`` in a single query"""
+    days = set(days)
+    counts = {
+        day: {'total': 0, **{code: 0 for code in STATUS_CODES}}
+        for day in days
+    }
+    rows = Attendance.objects.filter(date__in=days).values('date').annotate(
+        total=Count('id'),
+        **{code: Count('id', filter=Q(status=code)) for code in STATUS_CODES},
+    ).order_by()
+    for row in rows:
+        counts[row.pop('date')] = row
+    return counts
+
+
+def count_day_statuses(day):
+    """Attendance count per status code for one day, plus ``total``, in a single query"""
+    return count_statuses([day])[day]
+
+
+def day_status_counts(day):
+    """Cached attendance counts of a day, see count_day_statuses"""
+    counts = cache.get(_day_counts_key(day))
+    if counts is None:
+        counts = count_day_statuses(day)
+        cache.set(_day_counts_key(day), counts, DAY_COUNTS_TIMEOUT)
+    return counts
+
+
+def refresh_day_counts(days):
+    """Recount cached day counters once the current transaction commits"""
+    days = set(days)
+
+    def refresh():
+        cache.set_many(
+            {_day_counts_key(day): counts for day, counts in count_statuses(days).items()},
+            DAY_COUNTS_TIMEOUT,
+        )
+    transaction.on_commit(refresh)
+
+
+def mark_attendance(day, statuses):
+    """Upsert attendance for many employees on one day
+
+    ``statuses`` maps employee primary keys (as posted, so possibly strings)
+    to status codes. Unknown employees, malformed IDs and invalid statuses are
+    skipped. Returns ``(marked, failed)`` counts.
+    """
+    wanted = {}
+    failed = 0
+    for employee_id, status in statuses.items():
+        try:
+            employee_id = int(employee_id)
+        except (TypeError, ValueError):
+            failed += 1
+            continue
+        if status not in STATUS_CODES:
+            failed += 1
+            continue
+        wanted[employee_id] = status
+
+    existing = Employee.objects.in_bulk(list(wanted))
+    failed += len(wanted) - len(existing)
+
+    now = timezone.now()
+    rows = [
+        Attendance(employee_id=employee_id, date=day, status=wanted[employee_id],
+                   created_at=now, updated_at=now)
+        for employee_id in existing
+    ]
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['employee', 'date'],
+            update_fields=['status', 'updated_at'],
+        )
+        # bulk_create sends no post_save, so update summaries and flag payroll inputs here
+        pairs = [(employee_id, month_key(day)) for employee_id in existing]
+        refresh_summaries(pairs)
+        mark_payroll_dirty(pairs)
+        refresh_day_counts([day])
+    return len(rows), failed
+
+
+def fold_punches(pairs):
+    """Set first-in/last-out times on attendance from the stored punches
+
+    ``pairs`` holds ``(employee_id, date)`` tuples. Days without attendance are
+    created as present; the status of existing days is left alone. Returns the
+    number of attendance rows written.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    spans = PunchEvent.objects.filter(
+        employee_id__in={employee_id for employee_id, day in pairs},
+        date__in={day for employee_id, day in pairs},
+    ).values('employee_id', 'date').annotate(
+        first=Min('punched_at'),
+        last=Max('punched_at'),
+    )
+
+    now = timezone.now()
+    rows = []
+    for span in spans:
+        if (span['employee_id'], span['date']) not in pairs:
+            continue
+        check_out = span['last'] if span['last'] > span['first'] else None
+        rows.append(Attendance(
+            employee_id=span['employee_id'],
+            date=span['date'],
+            status='P',
+            check_in_time=timezone.localtime(span['first']).time(),
+            check_out_time=timezone.localtime(check_out).time() if check_out else None,
+            created_at=now,
+            updated_at=now,
+        ))
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['employee', 'date'],
+            update_fields=['check_in_time', 'check_out_time', 'updated_at'],
+        )
+        pairs = {(row.employee_id, month_key(row.date)) for row in rows}
+        refresh_summaries(pairs)
+        mark_payroll_dirty(pairs)
+        refresh_day_counts(row.date for row in rows)
+    return len(rows)
+
+
+def _generated_rows(leave_ids):
+    """Attendance rows still as leaves generated them: 'L' with no punch times
+
+    Rows someone has since marked otherwise or punched on belong to the day,
+    not the leave, and are never rewritten or deleted with it.
+    """
+    return Attendance.objects.filter(
+        leave_id__in=list(leave_ids), status='L',
+        check_in_time__isnull=True, check_out_time__isnull=True,
+    )
+
+
+def sync_leave_attendance(leaves):
+    """Make the attendance rows owned by leaves match their current state
+
+    Approved leaves get an 'L' row on every working day of their range that has
+    no attendance yet (weekly offs and HolidayCalendar days are skipped); rows a
+    leave generated and no longer wants are removed. Days already marked are
+    left alone. Returns the number of rows written.
+    """
+    leaves = list(leaves)
+    generated = {
+        (employee_id, day): (pk, leave_id, remarks)
+        for pk, employee_id, day, leave_id, remarks in _generated_rows(
+            leave.pk for leave in leaves
+        ).values_list('pk', 'employee_id', 'date', 'leave_id', 'remarks')
+    }
+
+    now = timezone.now()
+    wanted = {}
+    for leave in leaves:
+        if leave.status != 'A':
+            continue
+        day, end_date = as_date(leave.start_date), as_date(leave.end_date)
+        while day <= end_date:
+            if workdays.is_working_day(day):
+                wanted[(leave.employee_id, day)] = Attendance(
+                    employee_id=leave.employee_id, date=day, status='L', leave_id=leave.pk,
+                    remarks=leave.get_leave_type_display(), created_at=now, updated_at=now,
+                )
+            day += timedelta(days=1)
+    stale = {
+        key: pk for key, (pk, leave_id, remarks) in generated.items()
+        if key not in wanted or (wanted[key].leave_id, wanted[key].remarks) != (leave_id, remarks)
+    }
+    rows = [row for key, row in wanted.items() if key not in generated or key in stale]
+    touched = set(stale) | {(row.employee_id, row.date) for row in rows}
+    if not touched:
+        return 0
+
+    with transaction.atomic():
+        if stale:
+            # A raw delete skips the per-row signals; everything they would
+            # refresh is refreshed below for the whole set
+            stale_rows = Attendance.objects.filter(pk__in=list(stale.values()))
+            stale_rows._raw_delete(stale_rows.db)
+        # Days marked in the meantime keep their row
+        Attendance.objects.bulk_create(rows, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        pairs = {(employee_id, month_key(day)) for employee_id, day in touched}
+        refresh_summaries(pairs)
+        mark_payroll_dirty(pairs)
+        refresh_day_counts(day for employee_id, day in touched)
+    return len(rows)
+
+
+def remove_leave_attendance(leave_ids):
+    """Delete the attendance rows leaves generated, as when they are cancelled"""
+    generated = _generated_rows(leave_ids)
+    touched = set(generated.values_list('employee_id', 'date'))
+    if not touched:
+        return 0
+    with transaction.atomic():
+        generated._raw_delete(generated.db)
+        pairs = {(employee_id, month_key(day)) for employee_id, day in touched}
+        refresh_summaries(pairs, existing_only=True)
+        mark_payroll_dirty(pairs, existing_only=True)
+        refresh_day_counts(day for employee_id, day in touched)
+    return len(touched)
+
+
+def stream_attendance_csv(records, ordering=REPORT_ORDERING):
+    """Yield a filtered attendance queryset as CSV lines, walking it in keyset chunks"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(REPORT_HEADER)
+    for record in keyset_iterator(records, ordering, EXPORT_CHUNK_SIZE):
+        yield writer.writerow([
+            record.date.isoformat(),
+            record.employee.employee_id,
+            record.employee.full_name,
+            record.get_status_display(),
+            record.check_in_time or '',
+            record.check_out_time or '',
+            record.remarks,
+        ])
@@ -0,0 +1,84 @@
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, code_rows falls back to a Python loop
+    np = None
+
+# The attendance statuses of one employee-month packed into a fixed 12-byte blob:
+# day n occupies bits 3 * (n - 1) to 3 * n - 1 of a little-endian integer.
+BITS_PER_DAY = 3
+DAY_MASK = (1 << BITS_PER_DAY) - 1
+MAX_DAYS = 31
+BLOB_SIZE = (MAX_DAYS * BITS_PER_DAY + 7) // 8
+
+# Attendance status stored under each code; code 0 is an unmarked day.
+# This is a storage format, only ever append to it.
+STATUSES = [None, 'P', 'A', 'L', 'H', 'WFH', 'ML', 'PL']
+CODES = {status: code for code, status in enumerate(STATUSES) if status}
+
+
+def encode(day_statuses):
+    """Blob for a ``{day_of_month: status}`` mapping"""
+    value = 0
+    for day, status in day_statuses.items():
+        if not 1 <= day <= MAX_DAYS:
+            raise ValueError(f"Day {day} is outside a month")
+        try:
+            code = CODES[status]
+        except KeyError:
+            raise ValueError(f"Attendance status {status!r} cannot be packed")
+        value |= code << (BITS_PER_DAY * (day - 1))
+    return value.to_bytes(BLOB_SIZE, 'little')
+
+
+def decode(blob):
+    """``{day_of_month: status}`` for every marked day in a blob"""
+    value = int.from_bytes(blob or b'', 'little')
+    statuses = {}
+    day = 1
+    while value:
+        code = value & DAY_MASK
+        if code:
+            statuses[day] = STATUSES[code]
+        value >>= BITS_PER_DAY
+        day += 1
+    return statuses
+
+
+def count(blob, first_day=1, last_day=MAX_DAYS):
+    """Counter of statuses between two days of the month, inclusive"""
+    value = int.from_bytes(blob or b'', 'little') >> (BITS_PER_DAY * (first_day - 1))
+    value &= (1 << (BITS_PER_DAY * (last_day - first_day + 1))) - 1
+    counts = Counter()
+    while value:
+        code = value & DAY_MASK
+        if code:
+            counts[STATUSES[code]] += 1
+        value >>= BITS_PER_DAY
+    return counts
+
+
+def code_string(blob, days=MAX_DAYS):
+    """One digit per day, the status code of each day of the month ('0' when unmarked)"""
+    value = int.from_bytes(blob or b'', 'little')
+    digits = []
+    for _ in range(days):
+        digits.append(str(value & DAY_MASK))
+        value >>= BITS_PER_DAY
+    return ''.join(digits)
+
+
+def code_rows(blobs, days=MAX_DAYS):
+    """code_string for many blobs, unpacked as one matrix when NumPy is available"""
+    if np is None or not blobs:
+        return [code_string(blob, days) for blob in blobs]
+    packed = b''.join(bytes(blob or b'').ljust(BLOB_SIZE, b'\0') for blob in blobs)
+    bits = np.unpackbits(
+        np.frombuffer(packed, dtype=np.uint8).reshape(len(blobs), BLOB_SIZE),
+        axis=1, bitorder='little',
+    )
+    bits = bits[:, :days * BITS_PER_DAY].reshape(len(blobs), days, BITS_PER_DAY)
+    codes = bits[:, :, 0] | (bits[:, :, 1] << 1) | (bits[:, :, 2] << 2)
+    digits = (codes + ord('0')).astype(np.uint8)
+    return [row.tobytes().decode('ascii') for row in digits]
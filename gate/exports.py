@@ -0,0 +1,82 @@
+import csv
+
+from .models import PayrollRecord
+
+# Records fetched per database round-trip while streaming
+CHUNK_SIZE = 2000
+
+# Statuses a payroll month must have before its payouts can be exported
+PAYABLE_STATUSES = ['APPROVED', 'PAID']
+
+NEFT_HEADER = [
+    'Employee ID', 'Beneficiary Name', 'Account Number', 'IFSC Code',
+    'Bank Name', 'Amount', 'Narration',
+]
+
+# (width, align) of each fixed-width column, in NEFT_HEADER order
+NEFT_FIXED_WIDTHS = [
+    (20, '<'), (40, '<'), (30, '<'), (11, '<'), (40, '<'), (14, '>'), (30, '<'),
+]
+
+NEFT_FORMATS = ['csv', 'fixed']
+
+
+class Echo:
+    """File-like object that returns what is written, for streaming csv rows"""
+
+    def write(self, value):
+        return value
+
+
+def payable_records(payroll_month):
+    """Payroll records of a month that can be paid by bank transfer"""
+    return PayrollRecord.objects.filter(
+        payroll_month=payroll_month,
+        net_salary__gt=0,
+    ).exclude(
+        employee__account_number='',
+    ).exclude(
+        employee__ifsc_code='',
+    )
+
+
+def neft_rows(payroll_month):
+    """Bank transfer rows for a month, fetched in chunks"""
+    records = payable_records(payroll_month).select_related('employee').only(
+        'net_salary',
+        'employee__employee_id', 'employee__first_name', 'employee__last_name',
+        'employee__account_number', 'employee__ifsc_code', 'employee__bank_name',
+    ).order_by('employee__employee_id')
+    narration = f"SALARY {payroll_month.month}"
+    for record in records.iterator(chunk_size=CHUNK_SIZE):
+        employee = record.employee
+        yield [
+            employee.employee_id,
+            employee.full_name,
+            employee.account_number,
+            employee.ifsc_code.upper(),
+            employee.bank_name,
+            f"{record.net_salary:.2f}",
+            narration,
+        ]
+
+
+def _fixed_width_line(values):
+    return ''.join(
+        f"{str(value)[:width]:{align}{width}}"
+        for value, (width, align) in zip(values, NEFT_FIXED_WIDTHS)
+    ) + '\r\n'
+
+
+def stream_neft(payroll_month, fmt='csv'):
+    """Yield the bank transfer file for a month line by line, header first"""
+    if fmt == 'fixed':
+        yield _fixed_width_line(NEFT_HEADER)
+        for row in neft_rows(payroll_month):
+            yield _fixed_width_line(row)
+        return
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(NEFT_HEADER)
+    for row in neft_rows(payroll_month):
+        yield writer.writerow(row)
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .models import Attendance
+
+MINUTES_PER_DAY = 24 * 60
+
+# (start HH:MM, length in hours) of each shift, unless overridden in settings
+DEFAULT_SHIFTS = [('09:00', 8), ('21:00', 8)]
+DEFAULT_LATE_GRACE_MINUTES = 10
+
+# Monthly totals stored on AttendanceMonthlySummary
+HOURS_FIELDS = ['worked_minutes', 'overtime_minutes', 'late_days', 'late_minutes']
+
+
+@dataclass(frozen=True)
+class ShiftPolicy:
+    """Shift starts and lengths in minutes, and the grace before an arrival counts as late"""
+    shifts: tuple
+    late_grace: int
+
+    @classmethod
+    def from_settings(cls):
+        shifts = []
+        for start, hours in getattr(settings, 'GATE_SHIFTS', DEFAULT_SHIFTS):
+            hour, minute = (int(part) for part in start.split(':'))
+            shifts.append((hour * 60 + minute, int(hours * 60)))
+        grace = getattr(settings, 'GATE_LATE_GRACE_MINUTES', DEFAULT_LATE_GRACE_MINUTES)
+        return cls(shifts=tuple(shifts), late_grace=grace)
+
+
+def _minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def _offset(minute, start):
+    """Signed minutes from a shift start to a time of day, wrapped to +/- 12 hours"""
+    return (minute - start + MINUTES_PER_DAY // 2) % MINUTES_PER_DAY - MINUTES_PER_DAY // 2
+
+
+def shift_for(check_in, policy):
+    """(start, length) in minutes of the shift starting closest to a check-in time"""
+    arrived = _minute_of_day(check_in)
+    return min(policy.shifts, key=lambda shift: abs(_offset(arrived, shift[0])))
+
+
+def crosses_midnight(check_in, policy):
+    """Whether the shift a check-in belongs to ends on the next day"""
+    start, length = shift_for(check_in, policy)
+    return start + length > MINUTES_PER_DAY
+
+
+def ends_night_shift(check_in, punched, policy):
+    """Whether a punch the day after a check-in is the check-out of that night's shift
+
+    It is when the check-in's shift crosses midnight and the punch is nearer the
+    shift's end than the start of any shift, which would make it a new arrival.
+    """
+    if not crosses_midnight(check_in, policy):
+        return False
+    start, length = shift_for(check_in, policy)
+    minute = _minute_of_day(punched)
+    after_end = abs(_offset(minute, (start + length) % MINUTES_PER_DAY))
+    return all(after_end <= abs(_offset(minute, other)) for other, _ in policy.shifts)
+
+
+def day_hours(check_in, check_out, policy):
+    """(worked, overtime, late) minutes of one attendance day
+
+    The day is matched to the shift whose start is closest to the check-in.
+    A check-out earlier than the check-in is a night shift ending the next day.
+    """
+    if check_in is None:
+        return 0, 0, 0
+    arrived = _minute_of_day(check_in)
+    start, length = shift_for(check_in, policy)
+    late = _offset(arrived, start)
+    if late <= policy.late_grace:
+        late = 0
+    if check_out is None:
+        return 0, 0, late
+    worked = (_minute_of_day(check_out) - arrived) % MINUTES_PER_DAY
+    return worked, max(worked - length, 0), late
+
+
+def empty_totals():
+    return dict.fromkeys(HOURS_FIELDS, 0)
+
+
+def add_day(totals, check_in, check_out, policy):
+    """Add one attendance day to a dict of HOURS_FIELDS totals"""
+    worked, overtime, late = day_hours(check_in, check_out, policy)
+    totals['worked_minutes'] += worked
+    totals['overtime_minutes'] += overtime
+    if late:
+        totals['late_days'] += 1
+        totals['late_minutes'] += late
+    return totals
+
+
+def hours_between(start_date, end_date, employee_ids=None):
+    """HOURS_FIELDS totals per employee over an inclusive date range, in one pass over the rows"""
+    policy = ShiftPolicy.from_settings()
+    rows = Attendance.objects.filter(
+        date__range=[start_date, end_date], check_in_time__isnull=False,
+    )
+    if employee_ids is not None:
+        rows = rows.filter(employee_id__in=employee_ids)
+    totals = defaultdict(empty_totals)
+    rows = rows.values_list('employee_id', 'check_in_time', 'check_out_time').order_by()
+    for employee_id, check_in, check_out in rows.iterator(chunk_size=5000):
+        add_day(totals[employee_id], check_in, check_out, policy)
+    return dict(totals)
@@ -0,0 +1,143 @@
+import contextlib
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PayrollJob
+from .payroll import run_payroll
+
+# Minimum seconds between progress writes while a job is running
+PROGRESS_INTERVAL = 1.0
+
+# Running jobs without an update for this long belong to a worker that died
+STALE_AFTER = timedelta(minutes=10)
+
+# Seconds between heartbeats of a running job, well inside STALE_AFTER
+HEARTBEAT_INTERVAL = 30.0
+
+ACTIVE_STATUSES = ['QUEUED', 'RUNNING']
+
+
+def submit_payroll_job(payroll_month, user=None, workers=1, full_run=False):
+    """Queue a payroll run, reusing the month's job if one is already queued or running"""
+    job = payroll_month.jobs.filter(status__in=ACTIVE_STATUSES).first()
+    if job is None:
+        job = PayrollJob.objects.create(
+            payroll_month=payroll_month,
+            requested_by=user,
+            workers=workers,
+            full_run=full_run,
+        )
+    return job
+
+
+def claim_next_job():
+    """Mark the oldest queued job as running and return it, or None when the queue is empty"""
+    while True:
+        job = PayrollJob.objects.filter(status='QUEUED').order_by('created_at').first()
+        if job is None:
+            return None
+
+        # Only one worker can move the job out of QUEUED
+        now = timezone.now()
+        claimed = PayrollJob.objects.filter(pk=job.pk, status='QUEUED').update(
+            status='RUNNING',
+            attempts=F('attempts') + 1,
+            processed=0,
+            error='',
+            started_at=now,
+            finished_at=None,
+            updated_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_stale_jobs(stale_after=STALE_AFTER):
+    """Put running jobs whose heartbeat stopped back on the queue"""
+    cutoff = timezone.now() - stale_after
+    return PayrollJob.objects.filter(status='RUNNING', updated_at__lt=cutoff).update(
+        status='QUEUED', updated_at=timezone.now()
+    )
+
+
+def retry_job(job):
+    """Queue a failed job again"""
+    return PayrollJob.objects.filter(pk=job.pk, status='FAILED').update(
+        status='QUEUED', updated_at=timezone.now()
+    )
+
+
+@contextlib.contextmanager
+def heartbeat(job_id):
+    """Touch a running job's updated_at every HEARTBEAT_INTERVAL while the block runs
+
+    Progress goes quiet while a run writes its records in one transaction,
+    which on a large month can outlast STALE_AFTER. The beat comes from its own
+    thread and connection, so it is committed while the run's transaction is
+    still open.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                try:
+                    PayrollJob.objects.filter(pk=job_id, status='RUNNING').update(updated_at=timezone.now())
+                except DatabaseError:
+                    # SQLite locks writers out until the run commits; beat again later
+                    pass
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"payroll-job-{job_id}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Run a claimed job, recording progress and the outcome on the job row"""
+    last_write = 0.0
+
+    def progress(done, total):
+        nonlocal last_write
+        now = time.monotonic()
+        if done < total and now - last_write < PROGRESS_INTERVAL:
+            return
+        last_write = now
+        PayrollJob.objects.filter(pk=job.pk).update(
+            processed=done, total=total, updated_at=timezone.now()
+        )
+
+    try:
+        with heartbeat(job.pk):
+            result = run_payroll(
+                job.payroll_month,
+                user=job.requested_by,
+                workers=job.workers,
+                progress=progress,
+                full=job.full_run,
+            )
+    except Exception:
+        # The run writes in a single transaction, so a retry starts from a clean month
+        job.status = 'FAILED'
+        job.error = traceback.format_exc()
+        update_fields = ['status', 'error']
+    else:
+        job.status = 'DONE'
+        job.total = job.processed = result.employees
+        job.result = str(result)
+        update_fields = ['status', 'total', 'processed', 'result']
+    job.finished_at = timezone.now()
+    job.save(update_fields=update_fields + ['finished_at', 'updated_at'])
+    return job
@@ -0,0 +1,399 @@
+import bisect
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, F, Sum
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from . import workdays
+from .attendance import sync_leave_attendance
+from .models import (
+    Attendance, AttendanceMonthlySummary, Employee, Leave, LeaveBalance, LeaveLedgerEntry
+)
+from .payroll import BATCH_SIZE, LEAVE_STATUSES, as_date, mark_payroll_dirty, months_between
+
+# Days credited each month per leave type, unless overridden in settings
+DEFAULT_LEAVE_ACCRUALS = {'SL': '1.00', 'CL': '0.83'}
+# Earned leave accrues one day per this many days worked
+DEFAULT_EARNED_LEAVE_WORK_DAYS = 20
+
+CENT = Decimal('0.01')
+
+# Leave statuses that hold their dates; a rejected leave frees them
+ACTIVE_LEAVE_STATUSES = ['P', 'A']
+
+# Leave status each bulk decision sets
+DECISIONS = {'approve': 'A', 'reject': 'R'}
+
+# Employee date ranges OR'ed into one conflict query; SQLite parses a chain of
+# ORs as a tree, and too long a chain exceeds its expression depth limit
+CONFLICT_RANGES_PER_QUERY = 200
+
+# Newest first; unique, so it can drive keyset pagination
+LEAVE_ORDERING = ['-start_date', '-id']
+LEAVE_PAGE_SIZE = 50
+
+
+@dataclass
+class LeaveConflicts:
+    """Approved leaves and attendance a pending leave would collide with"""
+    leaves: list = field(default_factory=list)
+    attendance_days: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.leaves or self.attendance_days)
+
+
+def leave_days(leave):
+    """Working days a leave takes out of the balance, as its attendance rows do"""
+    return workdays.working_days_between(as_date(leave.start_date), as_date(leave.end_date))
+
+
+def post_entries(entries, existing_only=False):
+    """Append ledger entries and move the balances they touch, in one transaction
+
+    Balances change by one UPDATE per leave type and amount (in batches of
+    employees), so a month's accruals for everyone cost a handful of queries.
+    ``existing_only`` drops entries of employees that no longer exist. Returns
+    the entries written.
+    """
+    entries = [entry for entry in entries if entry.days]
+    if existing_only:
+        existing = set(Employee.objects.filter(
+            pk__in={entry.employee_id for entry in entries}
+        ).values_list('pk', flat=True))
+        entries = [entry for entry in entries if entry.employee_id in existing]
+    if not entries:
+        return []
+
+    deltas = defaultdict(Decimal)
+    for entry in entries:
+        deltas[(entry.employee_id, entry.leave_type)] += Decimal(entry.days)
+    employees_by_change = defaultdict(list)
+    for (employee_id, leave_type), delta in deltas.items():
+        if delta:
+            employees_by_change[(leave_type, delta)].append(employee_id)
+
+    now = timezone.now()
+    with transaction.atomic():
+        LeaveLedgerEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        LeaveBalance.objects.bulk_create(
+            [
+                LeaveBalance(employee_id=employee_id, leave_type=leave_type, updated_at=now)
+                for employee_id, leave_type in deltas
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        for (leave_type, delta), employee_ids in employees_by_change.items():
+            for start in range(0, len(employee_ids), BATCH_SIZE):
+                LeaveBalance.objects.filter(
+                    leave_type=leave_type, employee_id__in=employee_ids[start:start + BATCH_SIZE],
+                ).update(balance=F('balance') + delta, updated_at=now)
+    return entries
+
+
+def _posted(leave_ids):
+    """``{leave_id: {leave_type: days}}`` net ledger amounts posted for leaves"""
+    totals = (
+        LeaveLedgerEntry.objects.filter(leave_id__in=leave_ids)
+        .values_list('leave_id', 'leave_type').annotate(total=Sum('days')).order_by()
+    )
+    posted = defaultdict(dict)
+    for leave_id, leave_type, total in totals:
+        posted[leave_id][leave_type] = total
+    return posted
+
+
+def sync_leave_ledger(leaves):
+    """Post the debits or reversals that make each leave's ledger total match its state
+
+    An approved leave nets to minus its working days on its leave type, any
+    other leave nets to zero, so approving, rejecting, editing or re-syncing a
+    leave only ever posts the difference. Returns the entries written.
+    """
+    leaves = list(leaves)
+    posted = _posted([leave.pk for leave in leaves])
+    entries = []
+    for leave in leaves:
+        target = {leave.leave_type: -Decimal(leave_days(leave))} if leave.status == 'A' else {}
+        current = posted.get(leave.pk, {})
+        for leave_type in target.keys() | current.keys():
+            change = target.get(leave_type, 0) - current.get(leave_type, 0)
+            if change:
+                entries.append(LeaveLedgerEntry(
+                    employee_id=leave.employee_id, leave_type=leave_type,
+                    kind='DEBIT' if change < 0 else 'REVERSAL', days=change, leave_id=leave.pk,
+                ))
+    return post_entries(entries)
+
+
+def leave_reversals(leaves):
+    """Unsaved entries cancelling everything posted for leaves that are being deleted
+
+    They carry no link to the leave, which will be gone by the time they are posted.
+    """
+    leaves = list(leaves)
+    posted = _posted([leave.pk for leave in leaves])
+    return [
+        LeaveLedgerEntry(
+            employee_id=leave.employee_id, leave_type=leave_type, kind='REVERSAL',
+            days=-total, note=f"Leave #{leave.pk} deleted",
+        )
+        for leave in leaves
+        for leave_type, total in posted.get(leave.pk, {}).items() if total
+    ]
+
+
+def accrual_rates():
+    return {
+        leave_type: Decimal(str(days))
+        for leave_type, days in getattr(settings, 'GATE_LEAVE_ACCRUALS', DEFAULT_LEAVE_ACCRUALS).items()
+    }
+
+
+def accrue_month(month):
+    """Credit a YYYY-MM month's leave to every active employee; returns the entries written
+
+    Fixed monthly accruals come from GATE_LEAVE_ACCRUALS and earned leave from
+    the days worked in the month's attendance summary. Employees already
+    credited for the month are skipped, so a rerun is harmless.
+    """
+    rates = accrual_rates()
+    work_days = getattr(settings, 'GATE_EARNED_LEAVE_WORK_DAYS', DEFAULT_EARNED_LEAVE_WORK_DAYS)
+    credited = set(
+        LeaveLedgerEntry.objects.filter(kind='ACCRUAL', period=month)
+        .values_list('employee_id', 'leave_type')
+    )
+    worked = dict(
+        AttendanceMonthlySummary.objects.filter(month=month, employee__status='A')
+        .values_list('employee_id', F('present_days') + F('wfh_days'))
+    )
+    entries = []
+    for employee_id in Employee.objects.filter(status='A').values_list('pk', flat=True):
+        credits = dict(rates)
+        if work_days:
+            credits['EL'] = (Decimal(worked.get(employee_id, 0)) / work_days).quantize(CENT)
+        for leave_type, days in credits.items():
+            if (employee_id, leave_type) not in credited:
+                entries.append(LeaveLedgerEntry(
+                    employee_id=employee_id, leave_type=leave_type, kind='ACCRUAL',
+                    days=days, period=month,
+                ))
+    return post_entries(entries)
+
+
+def rebuild_balances():
+    """Recreate every balance by replaying the ledger; returns the number of balances"""
+    totals = (
+        LeaveLedgerEntry.objects.values_list('employee_id', 'leave_type')
+        .annotate(total=Sum('days')).order_by()
+    )
+    now = timezone.now()
+    balances = [
+        LeaveBalance(employee_id=employee_id, leave_type=leave_type, balance=total, updated_at=now)
+        for employee_id, leave_type, total in totals
+    ]
+    with transaction.atomic():
+        LeaveBalance.objects.all().delete()
+        LeaveBalance.objects.bulk_create(balances, batch_size=BATCH_SIZE)
+    return len(balances)
+
+
+def balances_for(employee):
+    """``[(leave_type, label, balance)]`` for every leave type, read from the balance rows"""
+    balances = dict(
+        LeaveBalance.objects.filter(employee=employee).values_list('leave_type', 'balance')
+    )
+    return [
+        (leave_type, label, balances.get(leave_type, Decimal('0.00')))
+        for leave_type, label in Leave.LEAVE_TYPE_CHOICES
+    ]
+
+
+def overlapping_leaves(employee_id, start_date, end_date, exclude=None, statuses=ACTIVE_LEAVE_STATUSES):
+    """An employee's leaves sharing any day with a date range
+
+    One range scan of the (employee, start_date, end_date) index.
+    """
+    leaves = Leave.objects.filter(
+        employee_id=employee_id, start_date__lte=end_date, end_date__gte=start_date,
+        status__in=statuses,
+    )
+    if exclude is not None:
+        leaves = leaves.exclude(pk=exclude)
+    return leaves.order_by('start_date')
+
+
+def _overlaps(pending, approved):
+    """(pending, approved) pairs of one employee's leaves that share a day
+
+    A sweep over both lists in start order, keeping each side's still-open
+    leaves in a heap by end date; every pair is met once, when the later of the
+    two starts.
+    """
+    events = sorted(
+        [(leave.start_date, 1, index, leave) for index, leave in enumerate(pending)]
+        + [(leave.start_date, 0, index, leave) for index, leave in enumerate(approved)],
+        key=lambda event: event[:3],
+    )
+    open_leaves = ([], [])  # Heaps of (end_date, index, leave): approved, pending
+    pairs = []
+    for start, side, index, leave in events:
+        for heap in open_leaves:
+            while heap and heap[0][0] < start:
+                heapq.heappop(heap)
+        for _, _, other in open_leaves[1 - side]:
+            pairs.append((leave, other) if side else (other, leave))
+        heapq.heappush(open_leaves[side], (leave.end_date, index, leave))
+    return pairs
+
+
+def _employee_ranges(leaves):
+    """``(employee_id, first, last)`` spans covering leaves, touching ones merged"""
+    ranges = []
+    for leave in sorted(leaves, key=lambda leave: (leave.employee_id, leave.start_date)):
+        if ranges and ranges[-1][0] == leave.employee_id and leave.start_date <= ranges[-1][2] + timedelta(days=1):
+            ranges[-1][2] = max(ranges[-1][2], leave.end_date)
+        else:
+            ranges.append([leave.employee_id, leave.start_date, leave.end_date])
+    return ranges
+
+
+def _column(model, name):
+    quote = connection.ops.quote_name
+    return f"{quote(model._meta.db_table)}.{quote(model._meta.get_field(name).column)}"
+
+
+def _in_ranges(ranges, condition):
+    """Filters OR-ing ``condition`` over CONFLICT_RANGES_PER_QUERY ranges at a time
+
+    ``condition`` is SQL taking an employee ID and a range's first and last
+    day as parameters. It is raw because compiling a few ORM lookups for each
+    of hundreds of ranges costs more than running the queries.
+    """
+    for start in range(0, len(ranges), CONFLICT_RANGES_PER_QUERY):
+        chunk = ranges[start:start + CONFLICT_RANGES_PER_QUERY]
+        yield RawSQL(
+            ' OR '.join([f"({condition})"] * len(chunk)),
+            [value for span in chunk for value in span],
+            output_field=BooleanField(),
+        )
+
+
+def leave_conflicts(pending):
+    """``{leave_id: LeaveConflicts}`` for a batch of pending leaves
+
+    Approved leaves and attendance are read only within each employee's own
+    leave dates, a query of each kind per CONFLICT_RANGES_PER_QUERY of those
+    ranges, then matched per leave in memory. Leaves without conflicts are
+    left out.
+    """
+    pending = list(pending)
+    if not pending:
+        return {}
+    ranges = _employee_ranges(pending)
+
+    approved = defaultdict(dict)  # By pk, as a leave may span ranges in two queries
+    marked = defaultdict(list)
+    overlapping = (
+        f"{_column(Leave, 'employee')} = %s AND {_column(Leave, 'end_date')} >= %s"
+        f" AND {_column(Leave, 'start_date')} <= %s"
+    )
+    for condition in _in_ranges(ranges, overlapping):
+        for leave in Leave.objects.filter(condition, status='A').order_by():
+            approved[leave.employee_id][leave.pk] = leave
+    within = f"{_column(Attendance, 'employee')} = %s AND {_column(Attendance, 'date')} BETWEEN %s AND %s"
+    for condition in _in_ranges(ranges, within):
+        for employee_id, day in Attendance.objects.filter(condition).exclude(
+            status__in=LEAVE_STATUSES,
+        ).values_list('employee_id', 'date').order_by():
+            marked[employee_id].append(day)
+
+    by_employee = defaultdict(list)
+    for leave in pending:
+        by_employee[leave.employee_id].append(leave)
+    conflicts = defaultdict(LeaveConflicts)
+    for employee_id, leaves in by_employee.items():
+        for leave, other in _overlaps(leaves, list(approved[employee_id].values())):
+            if other.pk != leave.pk:
+                conflicts[leave.pk].leaves.append(other)
+        days = sorted(marked[employee_id])
+        for leave in leaves:
+            start = bisect.bisect_left(days, leave.start_date)
+            end = bisect.bisect_right(days, leave.end_date)
+            if start < end:
+                conflicts[leave.pk].attendance_days.extend(days[start:end])
+    return dict(conflicts)
+
+
+def decide_leaves(leave_ids, action, user):
+    """Approve or reject many pending leaves at once; returns one result per ID
+
+    Results are ``{'id', 'result', 'detail'}`` dicts in the order of
+    ``leave_ids``, ``result`` being 'approved', 'rejected' or 'skipped'. Leaves
+    that are missing, no longer pending, or (when approving) overlap an
+    approved leave, an earlier leave of the batch or days with attendance
+    already marked are skipped. The decisions
+    are one UPDATE in one transaction, followed by the attendance, ledger and
+    payroll refreshes for the whole set, as a bulk update sends no signals.
+    """
+    status = DECISIONS[action]
+    leave_ids = list(dict.fromkeys(leave_ids))
+    results = {
+        leave_id: {'id': leave_id, 'result': 'skipped', 'detail': 'Leave not found'}
+        for leave_id in leave_ids
+    }
+    now = timezone.now()
+    with transaction.atomic():
+        leaves = list(Leave.objects.select_for_update().filter(pk__in=leave_ids).order_by('start_date', 'pk'))
+        pending = []
+        for leave in leaves:
+            if leave.status == 'P':
+                pending.append(leave)
+            else:
+                results[leave.pk]['detail'] = f"Already {leave.get_status_display().lower()}"
+
+        decided = pending
+        if status == 'A':
+            conflicts = leave_conflicts(pending)
+            decided = []
+            taken = defaultdict(list)  # Leaves of the batch approved so far, per employee
+            for leave in pending:
+                found = conflicts.get(leave.pk)
+                if found and found.leaves:
+                    other = found.leaves[0]
+                    results[leave.pk]['detail'] = (
+                        f"Overlaps approved leave {other.start_date} to {other.end_date}"
+                    )
+                elif found and found.attendance_days:
+                    results[leave.pk]['detail'] = (
+                        f"Attendance already marked on {len(found.attendance_days)} day(s)"
+                    )
+                elif any(other.end_date >= leave.start_date for other in taken[leave.employee_id]):
+                    results[leave.pk]['detail'] = 'Overlaps another leave approved in this batch'
+                else:
+                    taken[leave.employee_id].append(leave)
+                    decided.append(leave)
+
+        Leave.objects.filter(pk__in=[leave.pk for leave in decided], status='P').update(
+            status=status, approved_by=user, approval_date=now, updated_at=now,
+        )
+        for leave in decided:
+            leave.status, leave.approved_by, leave.approval_date = status, user, now
+            results[leave.pk].update(result='approved' if status == 'A' else 'rejected', detail='')
+
+        mark_payroll_dirty(
+            (leave.employee_id, month)
+            for leave in decided for month in months_between(leave.start_date, leave.end_date)
+        )
+        if status == 'A':
+            sync_leave_attendance(decided)
+            sync_leave_ledger(decided)
+    return [results[leave_id] for leave_id in leave_ids]
@@ -0,0 +1,31 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gate.leaves import accrue_month
+from gate.payroll import month_key, parse_month
+
+
+class Command(BaseCommand):
+    help = "Credit a month's leave accruals to every active employee (safe to rerun)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to accrue (YYYY-MM); the previous month by default')
+
+    def handle(self, *args, **options):
+        month = options['month']
+        if month:
+            try:
+                year, number = parse_month(month)
+            except ValueError as e:
+                raise CommandError(str(e))
+            month = f"{year}-{number:02d}"
+        else:
+            month = month_key(timezone.localdate().replace(day=1) - timedelta(days=1))
+
+        entries = accrue_month(month)
+        for leave_type, total in sorted(Counter(entry.leave_type for entry in entries).items()):
+            self.stdout.write(f"  {leave_type}: {total} employee(s)")
+        self.stdout.write(self.style.SUCCESS(f"Posted {len(entries)} accrual(s) for {month}"))
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gate.exports import NEFT_FORMATS, PAYABLE_STATUSES, payable_records, stream_neft
+from gate.models import PayrollMonth, PayrollRecord
+from gate.payroll import parse_month
+
+
+class Command(BaseCommand):
+    help = 'Write the bank transfer (NEFT) payout file for an approved payroll month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', required=True, help='Payroll month in YYYY-MM format')
+        parser.add_argument('--format', choices=NEFT_FORMATS, default='csv', dest='fmt')
+        parser.add_argument('--output', help='File to write, defaults to standard output')
+
+    def handle(self, *args, **options):
+        try:
+            year, month = parse_month(options['month'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        payroll_month = PayrollMonth.objects.filter(month=f"{year}-{month:02d}", year=year).first()
+        if payroll_month is None:
+            raise CommandError(f"Payroll {options['month']} has not been processed")
+        if payroll_month.status not in PAYABLE_STATUSES:
+            raise CommandError(f"Payroll {payroll_month.month} must be approved before exporting payouts")
+
+        if options['output']:
+            output = open(options['output'], 'w', newline='', encoding='utf-8')
+        else:
+            output = sys.stdout
+        try:
+            for line in stream_neft(payroll_month, options['fmt']):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        skipped = PayrollRecord.objects.filter(payroll_month=payroll_month).count() - \
+            payable_records(payroll_month).count()
+        if skipped:
+            self.stderr.write(self.style.WARNING(
+                f"Skipped {skipped} record(s) without bank details or with no net pay"
+            ))
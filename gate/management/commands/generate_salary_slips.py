@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gate.models import PayrollMonth
+from gate.payroll import parse_month
+from gate.slips import generate_month_slips
+
+
+class Command(BaseCommand):
+    help = 'Render salary slip PDFs for a payroll month into the slip cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', required=True, help='Payroll month in YYYY-MM format')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of processes rendering slips in parallel')
+
+    def handle(self, *args, **options):
+        try:
+            year, month = parse_month(options['month'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        payroll_month = PayrollMonth.objects.filter(month=f"{year}-{month:02d}", year=year).first()
+        if payroll_month is None:
+            raise CommandError(f"Payroll {options['month']} has not been processed")
+
+        started = time.perf_counter()
+        total, rendered, unsupported = generate_month_slips(payroll_month, workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{payroll_month.month}: {total} slip(s), {rendered} rendered, "
+            f"{total - rendered - unsupported} cached in {time.perf_counter() - started:.2f}s"
+        ))
+        if unsupported:
+            self.stdout.write(self.style.WARNING(
+                f"{unsupported} slip(s) use characters the PDF fonts cannot draw; "
+                f"print them from the salary slip page instead"
+            ))
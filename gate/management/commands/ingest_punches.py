@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gate.punches import PUNCH_FORMATS, ingest_punches, read_punches
+
+
+class Command(BaseCommand):
+    help = 'Load device punch streams (JSON lines or CSV) and fold them into attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="Punch files, or '-' for standard input")
+        parser.add_argument('--format', choices=PUNCH_FORMATS,
+                            help='Stream format; guessed from the file extension when omitted')
+
+    def handle(self, *args, **options):
+        for name in options['files']:
+            fmt = options['format']
+            if fmt is None:
+                fmt = 'csv' if name.lower().endswith('.csv') else 'jsonl'
+
+            if name == '-':
+                result = ingest_punches(read_punches(sys.stdin, fmt))
+            else:
+                path = Path(name)
+                if not path.exists():
+                    raise CommandError(f"{name} does not exist")
+                with path.open(newline='', encoding='utf-8') as stream:
+                    result = ingest_punches(read_punches(stream, fmt))
+            self.stdout.write(self.style.SUCCESS(f"{name}: {result}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from gate.attendance import sync_leave_attendance
+from gate.models import Leave
+
+
+class Command(BaseCommand):
+    help = 'Generate attendance rows for approved leaves, e.g. those approved before rows were generated'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Leaves synced per transaction')
+
+    def handle(self, *args, **options):
+        leaves = Leave.objects.filter(status='A').order_by('pk')
+        batch_size = options['batch_size']
+        batch = []
+        written = 0
+        for leave in leaves.iterator(chunk_size=batch_size):
+            batch.append(leave)
+            if len(batch) == batch_size:
+                written += sync_leave_attendance(batch)
+                batch = []
+        if batch:
+            written += sync_leave_attendance(batch)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} leave attendance row(s)"))
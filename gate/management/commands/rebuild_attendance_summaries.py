@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gate.attendance import rebuild_summaries
+from gate.payroll import parse_month
+
+
+class Command(BaseCommand):
+    help = 'Recreate the monthly attendance summaries and worked hours from raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Only rebuild this month (YYYY-MM); all months by default')
+
+    def handle(self, *args, **options):
+        month = options['month']
+        if month:
+            try:
+                year, number = parse_month(month)
+            except ValueError as e:
+                raise CommandError(str(e))
+            month = f"{year}-{number:02d}"
+
+        written = rebuild_summaries(month)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} summary row(s) for {month or 'all months'}"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gate.search import install
+
+
+class Command(BaseCommand):
+    help = ('Create the employee search index and its triggers if missing and refill it, '
+            'e.g. after a migration that rebuilt the employee table')
+
+    def handle(self, *args, **options):
+        if not install():
+            raise CommandError('This database does not support the FTS5 trigram search index; '
+                               'employee search falls back to icontains')
+        self.stdout.write(self.style.SUCCESS('Rebuilt the employee search index'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from gate.leaves import rebuild_balances, sync_leave_ledger
+from gate.models import Leave
+
+
+class Command(BaseCommand):
+    help = 'Recreate the leave balances by replaying the leave ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-leaves', action='store_true',
+                            help='First post any missing debits or reversals for every leave, '
+                                 'e.g. for leaves approved before the ledger existed')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Leaves synced per transaction')
+
+    def handle(self, *args, **options):
+        if options['sync_leaves']:
+            batch_size = options['batch_size']
+            batch = []
+            posted = 0
+            for leave in Leave.objects.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(leave)
+                if len(batch) == batch_size:
+                    posted += len(sync_leave_ledger(batch))
+                    batch = []
+            if batch:
+                posted += len(sync_leave_ledger(batch))
+            self.stdout.write(f"Posted {posted} leave ledger entr{'y' if posted == 1 else 'ies'}")
+
+        balances = rebuild_balances()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {balances} leave balance(s)"))
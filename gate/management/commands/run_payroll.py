@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gate.payroll import get_payroll_month, parse_month, run_payroll
+
+
+class Command(BaseCommand):
+    help = 'Process payroll for all active employees for a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', required=True, help='Payroll month in YYYY-MM format')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of processes computing payroll records in parallel')
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute every employee, not only those changed since the last run')
+
+    def handle(self, *args, **options):
+        try:
+            year, month = parse_month(options['month'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        payroll_month = get_payroll_month(year, month)
+        result = run_payroll(payroll_month, workers=options['workers'],
+                             full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Payroll processed for {result}"))
@@ -0,0 +1,32 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gate.anomalies import store_month
+from gate.models import AttendanceAnomaly
+from gate.payroll import month_key, parse_month
+
+
+class Command(BaseCommand):
+    help = 'Scan a month of attendance for anomalies and replace its anomaly report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to scan (YYYY-MM); the current month by default')
+
+    def handle(self, *args, **options):
+        month = options['month']
+        if month:
+            try:
+                year, number = parse_month(month)
+            except ValueError as e:
+                raise CommandError(str(e))
+            month = f"{year}-{number:02d}"
+        else:
+            month = month_key(timezone.localdate())
+
+        found = store_month(month)
+        labels = dict(AttendanceAnomaly.KIND_CHOICES)
+        for kind, total in sorted(Counter(anomaly.kind for anomaly in found).items()):
+            self.stdout.write(f"  {labels[kind]}: {total}")
+        self.stdout.write(self.style.SUCCESS(f"Found {len(found)} anomal{'y' if len(found) == 1 else 'ies'} in {month}"))
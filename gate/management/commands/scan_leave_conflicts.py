@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gate.leaves import leave_conflicts
+from gate.models import Department, Leave
+
+
+class Command(BaseCommand):
+    help = 'List pending leaves that overlap approved leaves or marked attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', help='Only scan this department (ID or name)')
+
+    def handle(self, *args, **options):
+        pending = Leave.objects.filter(status='P').select_related('employee').order_by('employee_id', 'start_date')
+        department = options['department']
+        if department:
+            lookup = {'pk': department} if department.isdigit() else {'name': department}
+            department = Department.objects.filter(**lookup).first()
+            if department is None:
+                raise CommandError(f"Department '{options['department']}' not found")
+            pending = pending.filter(employee__department=department)
+
+        pending = list(pending)
+        conflicts = leave_conflicts(pending)
+        for leave in pending:
+            found = conflicts.get(leave.pk)
+            if not found:
+                continue
+            self.stdout.write(
+                f"{leave.employee.employee_id} {leave.get_leave_type_display()} "
+                f"{leave.start_date} to {leave.end_date}:"
+            )
+            for other in found.leaves:
+                self.stdout.write(f"  overlaps approved leave #{other.pk} ({other.start_date} to {other.end_date})")
+            if found.attendance_days:
+                days = ', '.join(str(day) for day in found.attendance_days)
+                self.stdout.write(f"  attendance marked on {days}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(conflicts)} of {len(pending)} pending leave(s) have conflicts"
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0002_payrolljob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrolljob',
+            name='full_run',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='PayrollDirty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=7)),
+                ('changed_at', models.DateTimeField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_dirty', to='gate.employee')),
+            ],
+            options={
+                'verbose_name_plural': 'Payroll Dirty Entries',
+                'indexes': [models.Index(fields=['month', 'changed_at'], name='gate_payrol_month_928dfd_idx')],
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0003_payroll_dirty_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrollrecord',
+            name='installment_deductions',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='DeductionInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('deduction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='gate.deduction')),
+                ('payroll_month', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deduction_installments', to='gate.payrollmonth')),
+            ],
+            options={
+                'verbose_name_plural': 'Deduction Installments',
+                'unique_together': {('deduction', 'payroll_month')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0004_deduction_installments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PunchEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(max_length=50)),
+                ('event_id', models.CharField(max_length=100)),
+                ('punched_at', models.DateTimeField()),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punches', to='gate.employee')),
+            ],
+            options={
+                'ordering': ['-punched_at'],
+                'indexes': [models.Index(fields=['employee', 'date'], name='gate_punche_employe_1a2843_idx')],
+                'unique_together': {('device_id', 'event_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def build_summaries(apps, schema_editor):
+    Attendance = apps.get_model('gate', 'Attendance')
+    AttendanceMonthlySummary = apps.get_model('gate', 'AttendanceMonthlySummary')
+    statuses = {
+        'present_days': ['P'],
+        'absent_days': ['A'],
+        'leave_days': ['L', 'ML', 'PL'],
+        'half_days': ['H'],
+        'wfh_days': ['WFH'],
+    }
+    counts = Attendance.objects.annotate(
+        year=ExtractYear('date'), month_number=ExtractMonth('date'),
+    ).values('employee_id', 'year', 'month_number').annotate(**{
+        field: Count('id', filter=Q(status__in=codes)) for field, codes in statuses.items()
+    }).order_by()
+    summaries = []
+    for row in counts:
+        month = f"{row.pop('year')}-{row.pop('month_number'):02d}"
+        summaries.append(AttendanceMonthlySummary(month=month, **row))
+    AttendanceMonthlySummary.objects.bulk_create(summaries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0005_punch_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=7)),
+                ('present_days', models.PositiveSmallIntegerField(default=0)),
+                ('absent_days', models.PositiveSmallIntegerField(default=0)),
+                ('leave_days', models.PositiveSmallIntegerField(default=0)),
+                ('half_days', models.PositiveSmallIntegerField(default=0)),
+                ('wfh_days', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='gate.employee')),
+            ],
+            options={
+                'verbose_name_plural': 'Attendance Monthly Summaries',
+                'indexes': [models.Index(fields=['month'], name='gate_attend_month_e6313a_idx')],
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# Frozen copy of the gate.daybits format: 3 bits per day in a 12-byte
+# little-endian blob, codes indexed by status
+STATUSES = [None, 'P', 'A', 'L', 'H', 'WFH', 'ML', 'PL']
+CODES = {status: code for code, status in enumerate(STATUSES) if status}
+
+
+def encode(day_statuses):
+    value = 0
+    for day, status in day_statuses.items():
+        value |= CODES[status] << (3 * (day - 1))
+    return value.to_bytes(12, 'little')
+
+
+def pack_day_statuses(apps, schema_editor):
+    Attendance = apps.get_model('gate', 'Attendance')
+    AttendanceMonthlySummary = apps.get_model('gate', 'AttendanceMonthlySummary')
+    days = defaultdict(dict)
+    for employee_id, day, status in Attendance.objects.values_list('employee_id', 'date', 'status').iterator():
+        days[(employee_id, f"{day.year}-{day.month:02d}")][day.day] = status
+    summaries = list(AttendanceMonthlySummary.objects.only('employee_id', 'month'))
+    for summary in summaries:
+        summary.day_statuses = encode(days.get((summary.employee_id, summary.month), {}))
+    AttendanceMonthlySummary.objects.bulk_update(summaries, ['day_statuses'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0006_attendance_monthly_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancemonthlysummary',
+            name='day_statuses',
+            field=models.BinaryField(default=b'', max_length=12),
+        ),
+        migrations.RunPython(pack_day_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0007_attendance_day_statuses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='leave',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_records', to='gate.leave'),
+        ),
+    ]
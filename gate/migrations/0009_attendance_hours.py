@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# Frozen copy of the gate.hours rules with the default shift policy: (start,
+# length) in minutes of each shift and the grace before an arrival is late.
+# Sites with their own GATE_SHIFTS recompute with rebuild_attendance_summaries.
+SHIFTS = [(9 * 60, 8 * 60), (21 * 60, 8 * 60)]
+LATE_GRACE = 10
+HOURS_FIELDS = ['worked_minutes', 'overtime_minutes', 'late_days', 'late_minutes']
+
+
+def offset(minute, start):
+    return (minute - start + 720) % 1440 - 720
+
+
+def add_day(totals, check_in, check_out):
+    arrived = check_in.hour * 60 + check_in.minute
+    start, length = min(SHIFTS, key=lambda shift: abs(offset(arrived, shift[0])))
+    late = offset(arrived, start)
+    if late > LATE_GRACE:
+        totals['late_days'] += 1
+        totals['late_minutes'] += late
+    if check_out is not None:
+        worked = (check_out.hour * 60 + check_out.minute - arrived) % 1440
+        totals['worked_minutes'] += worked
+        totals['overtime_minutes'] += max(worked - length, 0)
+
+
+def empty_totals():
+    return dict.fromkeys(HOURS_FIELDS, 0)
+
+
+def compute_hours(apps, schema_editor):
+    Attendance = apps.get_model('gate', 'Attendance')
+    AttendanceMonthlySummary = apps.get_model('gate', 'AttendanceMonthlySummary')
+    totals = defaultdict(empty_totals)
+    records = Attendance.objects.filter(check_in_time__isnull=False).values_list(
+        'employee_id', 'date', 'check_in_time', 'check_out_time'
+    )
+    for employee_id, day, check_in, check_out in records.iterator():
+        add_day(totals[(employee_id, f"{day.year}-{day.month:02d}")], check_in, check_out)
+    summaries = list(AttendanceMonthlySummary.objects.only('employee_id', 'month'))
+    for summary in summaries:
+        for field, value in totals.get((summary.employee_id, summary.month), empty_totals()).items():
+            setattr(summary, field, value)
+    AttendanceMonthlySummary.objects.bulk_update(summaries, HOURS_FIELDS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0008_attendance_leave'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancemonthlysummary',
+            name='late_days',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancemonthlysummary',
+            name='late_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancemonthlysummary',
+            name='overtime_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancemonthlysummary',
+            name='worked_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(compute_hours, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0009_attendance_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=7)),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('NO_OUT', 'Missing Check-Out'), ('OUT_BEFORE_IN', 'Check-Out Before Check-In'), ('NO_PUNCH', 'Present Without Punches'), ('HOLIDAY', 'Marked On Holiday'), ('ON_LEAVE', 'Marked During Approved Leave')], max_length=15)),
+                ('detail', models.CharField(blank=True, max_length=200)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_anomalies', to='gate.employee')),
+            ],
+            options={
+                'verbose_name_plural': 'Attendance Anomalies',
+                'ordering': ['date', 'employee'],
+                'indexes': [models.Index(fields=['month', 'kind'], name='gate_attend_month_70df53_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0010_attendance_anomalies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('SL', 'Sick Leave'), ('CL', 'Casual Leave'), ('EL', 'Earned Leave'), ('UL', 'Unpaid Leave'), ('ML', 'Maternity Leave'), ('PL', 'Paternity Leave')], max_length=2)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to='gate.employee')),
+            ],
+            options={
+                'verbose_name_plural': 'Leave Balances',
+                'unique_together': {('employee', 'leave_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('SL', 'Sick Leave'), ('CL', 'Casual Leave'), ('EL', 'Earned Leave'), ('UL', 'Unpaid Leave'), ('ML', 'Maternity Leave'), ('PL', 'Paternity Leave')], max_length=2)),
+                ('kind', models.CharField(choices=[('ACCRUAL', 'Accrual'), ('DEBIT', 'Debit'), ('REVERSAL', 'Reversal'), ('ADJUSTMENT', 'Adjustment')], max_length=10)),
+                ('days', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('period', models.CharField(blank=True, max_length=7)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to='gate.employee')),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='gate.leave')),
+            ],
+            options={
+                'verbose_name_plural': 'Leave Ledger Entries',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['employee', 'leave_type'], name='gate_leavel_employe_810281_idx'), models.Index(fields=['kind', 'period'], name='gate_leavel_kind_30c23e_idx')],
+            },
+        ),
+    ]
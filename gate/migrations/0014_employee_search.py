@@ -0,0 +1,63 @@
+from django.db import OperationalError, migrations
+
+# Frozen copy of the index definition in gate/search.py at the time of writing
+INSTALL_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS gate_employee_search USING fts5(
+        employee_id, first_name, last_name, email,
+        content='gate_employee', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS gate_employee_search_ai AFTER INSERT ON gate_employee BEGIN
+        INSERT INTO gate_employee_search(rowid, employee_id, first_name, last_name, email)
+        VALUES (new.id, new.employee_id, new.first_name, new.last_name, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS gate_employee_search_ad AFTER DELETE ON gate_employee BEGIN
+        INSERT INTO gate_employee_search(gate_employee_search, rowid, employee_id, first_name, last_name, email)
+        VALUES ('delete', old.id, old.employee_id, old.first_name, old.last_name, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS gate_employee_search_au
+    AFTER UPDATE OF employee_id, first_name, last_name, email ON gate_employee BEGIN
+        INSERT INTO gate_employee_search(gate_employee_search, rowid, employee_id, first_name, last_name, email)
+        VALUES ('delete', old.id, old.employee_id, old.first_name, old.last_name, old.email);
+        INSERT INTO gate_employee_search(rowid, employee_id, first_name, last_name, email)
+        VALUES (new.id, new.employee_id, new.first_name, new.last_name, new.email);
+    END""",
+    "INSERT INTO gate_employee_search(gate_employee_search) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS gate_employee_search_ai",
+    "DROP TRIGGER IF EXISTS gate_employee_search_ad",
+    "DROP TRIGGER IF EXISTS gate_employee_search_au",
+    "DROP TABLE IF EXISTS gate_employee_search",
+]
+
+
+def run(connection, statements):
+    # Databases without SQLite's FTS5 trigram tokenizer search with icontains
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    except OperationalError:
+        pass
+
+
+def install_search(apps, schema_editor):
+    run(schema_editor.connection, INSTALL_SQL)
+
+
+def uninstall_search(apps, schema_editor):
+    run(schema_editor.connection, UNINSTALL_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0013_leave_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
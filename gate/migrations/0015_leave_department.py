@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_departments(apps, schema_editor):
+    Employee = apps.get_model('gate', 'Employee')
+    Leave = apps.get_model('gate', 'Leave')
+    Leave.objects.update(department_id=models.Subquery(
+        Employee.objects.filter(pk=models.OuterRef('employee_id')).values('department_id')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate', '0014_employee_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leave',
+            name='department',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leaves', to='gate.department'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['department', 'start_date', 'id'], name='gate_leave_departm_57a8c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['department', 'status', 'start_date', 'id'], name='gate_leave_departm_d6304e_idx'),
+        ),
+        migrations.RunPython(copy_departments, migrations.RunPython.noop),
+    ]
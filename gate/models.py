@@ -134,6 +134,8 @@ class Attendance(models.Model):
     check_in_time = models.TimeField(null=True, blank=True)
     check_out_time = models.TimeField(null=True, blank=True)
     remarks = models.TextField(blank=True)
+    # Set on rows generated from an approved leave, which owns them
+    leave = models.ForeignKey('Leave', on_delete=models.SET_NULL, null=True, blank=True, related_name='attendance_records')
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -151,6 +153,101 @@ class Attendance(models.Model):
         ]
 
 
+class AttendanceMonthlySummary(models.Model):
+    """Attendance status counts per employee per month, kept in step with Attendance"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_summaries')
+    month = models.CharField(max_length=7)  # Format: YYYY-MM
+    present_days = models.PositiveSmallIntegerField(default=0)
+    absent_days = models.PositiveSmallIntegerField(default=0)
+    leave_days = models.PositiveSmallIntegerField(default=0)
+    half_days = models.PositiveSmallIntegerField(default=0)
+    wfh_days = models.PositiveSmallIntegerField(default=0)
+    # Every day's status, 3 bits per day (see gate.daybits)
+    day_statuses = models.BinaryField(max_length=12, default=b'')
+    # Hours from check-in/check-out times under the shift policy (see gate.hours)
+    worked_minutes = models.PositiveIntegerField(default=0)
+    overtime_minutes = models.PositiveIntegerField(default=0)
+    late_days = models.PositiveSmallIntegerField(default=0)
+    late_minutes = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.month}"
+    
+    @property
+    def total_days(self):
+        """Days with any attendance marked"""
+        return self.present_days + self.absent_days + self.leave_days + self.half_days + self.wfh_days
+    
+    @property
+    def worked_hours(self):
+        return round(self.worked_minutes / 60, 2)
+    
+    @property
+    def overtime_hours(self):
+        return round(self.overtime_minutes / 60, 2)
+    
+    class Meta:
+        verbose_name_plural = "Attendance Monthly Summaries"
+        unique_together = ('employee', 'month')
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+
+class PunchEvent(models.Model):
+    """Raw punch from a turnstile or biometric reader"""
+    device_id = models.CharField(max_length=50)
+    event_id = models.CharField(max_length=100)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='punches')
+    punched_at = models.DateTimeField()
+    # Attendance day it folds into: the local date of punched_at, or the day
+    # before for the check-out of a night shift
+    date = models.DateField()
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.device_id}/{self.event_id} - {self.employee_id} at {self.punched_at}"
+    
+    class Meta:
+        unique_together = ('device_id', 'event_id')
+        ordering = ['-punched_at']
+        indexes = [
+            models.Index(fields=['employee', 'date']),
+        ]
+
+
+class AttendanceAnomaly(models.Model):
+    """Suspicious attendance found by the monthly anomaly scan"""
+    KIND_CHOICES = [
+        ('NO_OUT', 'Missing Check-Out'),
+        ('OUT_BEFORE_IN', 'Check-Out Before Check-In'),
+        ('NO_PUNCH', 'Present Without Punches'),
+        ('HOLIDAY', 'Marked On Holiday'),
+        ('ON_LEAVE', 'Marked During Approved Leave'),
+    ]
+    
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_anomalies')
+    month = models.CharField(max_length=7)  # Format: YYYY-MM
+    date = models.DateField()
+    kind = models.CharField(max_length=15, choices=KIND_CHOICES)
+    detail = models.CharField(max_length=200, blank=True)
+    
+    detected_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.date} ({self.kind})"
+    
+    class Meta:
+        verbose_name_plural = "Attendance Anomalies"
+        ordering = ['date', 'employee']
+        indexes = [
+            models.Index(fields=['month', 'kind']),
+        ]
+
+
 class Leave(models.Model):
     """Track employee leaves"""
     LEAVE_TYPE_CHOICES = [
@@ -169,6 +266,9 @@ class Leave(models.Model):
     ]
     
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leaves')
+    # The employee's current department, copied so a department's leave list
+    # pages through one index; kept in step by signals
+    department = models.ForeignKey('Department', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='leaves')
     leave_type = models.CharField(max_length=2, choices=LEAVE_TYPE_CHOICES)
     start_date = models.DateField()
     end_date = models.DateField()
@@ -191,6 +291,65 @@ class Leave(models.Model):
     class Meta:
         verbose_name_plural = "Leaves"
         ordering = ['-start_date']
+        indexes = [
+            # Overlap checks seek the employee, then range over start_date
+            # with end_date read from the index
+            models.Index(fields=['employee', 'start_date', 'end_date']),
+            # Leave list pages, newest first, unfiltered or by status or type
+            models.Index(fields=['start_date']),
+            models.Index(fields=['status', 'start_date']),
+            models.Index(fields=['leave_type', 'start_date']),
+            # The same for one department, unfiltered or by status
+            models.Index(fields=['department', 'start_date', 'id']),
+            models.Index(fields=['department', 'status', 'start_date', 'id']),
+        ]
+
+
+class LeaveLedgerEntry(models.Model):
+    """Append-only movement of an employee's leave balance"""
+    KIND_CHOICES = [
+        ('ACCRUAL', 'Accrual'),
+        ('DEBIT', 'Debit'),
+        ('REVERSAL', 'Reversal'),
+        ('ADJUSTMENT', 'Adjustment'),
+    ]
+    
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.CharField(max_length=2, choices=Leave.LEAVE_TYPE_CHOICES)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    days = models.DecimalField(max_digits=6, decimal_places=2)  # Credits positive, debits negative
+    leave = models.ForeignKey(Leave, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    period = models.CharField(max_length=7, blank=True)  # YYYY-MM an accrual is for
+    note = models.CharField(max_length=200, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.leave_type} {self.kind} {self.days}"
+    
+    class Meta:
+        verbose_name_plural = "Leave Ledger Entries"
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['employee', 'leave_type']),
+            models.Index(fields=['kind', 'period']),
+        ]
+
+
+class LeaveBalance(models.Model):
+    """Running total of an employee's ledger entries for one leave type"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=2, choices=Leave.LEAVE_TYPE_CHOICES)
+    balance = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.leave_type}: {self.balance}"
+    
+    class Meta:
+        verbose_name_plural = "Leave Balances"
+        unique_together = ('employee', 'leave_type')
 
 
 class PayrollMonth(models.Model):
@@ -249,6 +408,7 @@ class PayrollRecord(models.Model):
     esi_contribution = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     income_tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     other_deductions = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    installment_deductions = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     
     # Calculated Deductions
     total_deductions = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -271,7 +431,8 @@ class PayrollRecord(models.Model):
         
         # Calculate total deductions
         self.total_deductions = (self.pf_contribution + self.esi_contribution + 
-                                self.income_tax + self.other_deductions)
+                                self.income_tax + self.other_deductions +
+                                self.installment_deductions)
         
         # Calculate net salary
         self.net_salary = self.gross_salary - self.total_deductions
@@ -308,6 +469,70 @@ class SalarySlip(models.Model):
         ordering = ['-issue_date']
 
 
+class PayrollJob(models.Model):
+    """Queued payroll run picked up by the payroll worker"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    payroll_month = models.ForeignKey(PayrollMonth, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    workers = models.IntegerField(default=1, validators=[MinValueValidator(1)])
+    full_run = models.BooleanField(default=False)
+    
+    # Progress
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Payroll Job #{self.pk} - {self.payroll_month.month} ({self.status})"
+    
+    @property
+    def percent(self):
+        """Progress as a whole percentage"""
+        if self.status == 'DONE':
+            return 100
+        if not self.total:
+            return 0
+        return min(99, self.processed * 100 // self.total)
+    
+    class Meta:
+        verbose_name_plural = "Payroll Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class PayrollDirty(models.Model):
+    """Employee-months whose payroll inputs changed since they were last processed"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='payroll_dirty')
+    month = models.CharField(max_length=7)  # Format: YYYY-MM
+    changed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.month}"
+    
+    class Meta:
+        verbose_name_plural = "Payroll Dirty Entries"
+        unique_together = ('employee', 'month')
+        indexes = [
+            models.Index(fields=['month', 'changed_at']),
+        ]
+
+
 class Deduction(models.Model):
     """Additional one-time deductions (loans, etc.)"""
     DEDUCTION_TYPE_CHOICES = [
@@ -339,11 +564,53 @@ class Deduction(models.Model):
     def __str__(self):
         return f"{self.employee.full_name} - {self.get_deduction_type_display()}"
     
+    @property
+    def remaining_amount(self):
+        """Amount still to be recovered"""
+        if self.monthly_installment:
+            return max(self.amount - self.monthly_installment * self.installments_paid, 0)
+        return 0 if self.installments_paid else self.amount
+    
+    def next_installment(self):
+        """Amount to deduct in the next payroll month"""
+        if self.monthly_installment:
+            return min(self.monthly_installment, self.remaining_amount)
+        return self.remaining_amount
+    
+    def record_installment(self, amount):
+        """Count an installment of ``amount`` as paid and deactivate a finished deduction
+
+        Nothing is counted when nothing was deducted, so a month that charged
+        no installment does not use one up.
+        """
+        if amount > 0:
+            self.installments_paid += 1
+        if self.remaining_amount <= 0 or (
+            self.number_of_installments and self.installments_paid >= self.number_of_installments
+        ):
+            self.is_active = False
+    
     class Meta:
         verbose_name_plural = "Deductions"
         ordering = ['-created_at']
 
 
+class DeductionInstallment(models.Model):
+    """Amount of a deduction applied in a payroll month"""
+    deduction = models.ForeignKey(Deduction, on_delete=models.CASCADE, related_name='installments')
+    payroll_month = models.ForeignKey(PayrollMonth, on_delete=models.CASCADE, related_name='deduction_installments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.deduction} - {self.payroll_month.month}"
+    
+    class Meta:
+        verbose_name_plural = "Deduction Installments"
+        unique_together = ('deduction', 'payroll_month')
+
+
 class HolidayCalendar(models.Model):
     """Store company holidays"""
     date = models.DateField(unique=True)
@@ -0,0 +1,90 @@
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Rows per page of keyset-paginated lists
+PAGE_SIZE = 100
+
+
+@dataclass
+class KeysetPage:
+    """One page of a keyset-paginated queryset"""
+    items: list = field(default_factory=list)
+    next_cursor: str = ''
+
+    @property
+    def has_next(self):
+        return bool(self.next_cursor)
+
+
+def _encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(queryset, names, cursor):
+    """Cursor values converted back to field types, or None if the cursor is invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(names):
+            return None
+        return [
+            queryset.model._meta.get_field(name).to_python(value)
+            for name, value in zip(names, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _after(names, values, descending):
+    """Filter for rows strictly after ``values`` in (names...) order"""
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for i, name in enumerate(names):
+        step = Q(**{name: value for name, value in zip(names[:i], values[:i])})
+        step &= Q(**{f"{name}__{lookup}": values[i]})
+        condition |= step
+    # The redundant bound on the leading field keeps the scan an index range
+    return Q(**{f"{names[0]}__{lookup}e": values[0]}) & condition
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=PAGE_SIZE):
+    """Fetch the page of ``queryset`` that follows ``cursor`` in ``ordering``
+
+    ``ordering`` lists unique-together field names, all ascending or all
+    descending (e.g. ``['-date', '-id']``). Each page is a single indexed range
+    scan however deep into the list it is, unlike OFFSET pagination.
+    """
+    descending = ordering[0].startswith('-')
+    names = [name.lstrip('-') for name in ordering]
+    if any(name.startswith('-') != descending for name in ordering):
+        raise ValueError('Keyset ordering fields must share one direction')
+
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = _decode_cursor(queryset, names, cursor)
+        if values is not None:
+            queryset = queryset.filter(_after(names, values, descending))
+
+    items = list(queryset[:page_size + 1])
+    page = KeysetPage(items=items[:page_size])
+    if len(items) > page_size:
+        last = page.items[-1]
+        attnames = [queryset.model._meta.get_field(name).attname for name in names]
+        page.next_cursor = _encode_cursor([getattr(last, attname) for attname in attnames])
+    return page
+
+
+def keyset_iterator(queryset, ordering, chunk_size=2000):
+    """Yield every row of ``queryset`` in ``ordering``, one keyset page at a time"""
+    cursor = None
+    while True:
+        page = keyset_page(queryset, ordering, cursor, chunk_size)
+        yield from page.items
+        if not page.has_next:
+            return
+        cursor = page.next_cursor
@@ -0,0 +1,443 @@
+import contextlib
+import itertools
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import payroll_calc, workdays
+from .models import (
+    AttendanceMonthlySummary, Deduction, DeductionInstallment, Employee, PayrollDirty,
+    PayrollMonth, PayrollRecord, SalarySlip, SalaryStructure
+)
+from .workers import process_pool
+
+# Rows per INSERT/UPDATE statement when writing a run
+BATCH_SIZE = 500
+
+# Salary structure fields copied onto each payroll record
+SALARY_FIELDS = [
+    'basic_salary', 'hra', 'dearness_allowance', 'conveyance',
+    'medical_allowance', 'other_allowances',
+    'pf_contribution', 'esi_contribution', 'income_tax', 'other_deductions',
+]
+
+# Salary structure fields plus deductions computed by the run
+COMPONENT_FIELDS = SALARY_FIELDS + ['installment_deductions']
+
+# Payroll record fields written by a run: day counts, then amounts
+DAY_FIELDS = ['working_days', 'present_days', 'absent_days', 'leave_days']
+AMOUNT_FIELDS = COMPONENT_FIELDS + ['gross_salary', 'total_deductions', 'net_salary']
+RECORD_FIELDS = DAY_FIELDS + AMOUNT_FIELDS
+
+LEAVE_STATUSES = ['L', 'ML', 'PL']
+
+
+@dataclass
+class PayrollRunResult:
+    """Summary of a single payroll run"""
+    payroll_month: PayrollMonth
+    employees: int = 0
+    created: int = 0
+    updated: int = 0
+    slips_created: int = 0
+    installments: int = 0
+    incremental: bool = False
+    query_count: int = 0
+    elapsed: float = 0.0
+
+    def __str__(self):
+        mode = 'incremental' if self.incremental else 'full'
+        return (
+            f"{self.payroll_month.month} ({mode}): {self.employees} employee(s) "
+            f"({self.created} created, {self.updated} updated, "
+            f"{self.slips_created} slips, {self.installments} installments) "
+            f"in {self.elapsed:.2f}s using {self.query_count} queries"
+        )
+
+
+class QueryCounter:
+    """Database execute wrapper that counts executed queries"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def month_bounds(year, month):
+    """Return the first and last date of a month"""
+    month_start = date(year, month, 1)
+    if month == 12:
+        month_end = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        month_end = date(year, month + 1, 1) - timedelta(days=1)
+    return month_start, month_end
+
+
+def get_payroll_month(year, month):
+    """Create or get the payroll month for a year and month"""
+    payroll_month, created = PayrollMonth.objects.get_or_create(
+        month=f"{year}-{month:02d}",
+        year=year,
+        defaults={'status': 'DRAFT'}
+    )
+    return payroll_month
+
+
+def as_date(value):
+    """A date, parsing the ISO strings model instances built from form data may still hold"""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def month_key(day):
+    """YYYY-MM key of the month containing a date"""
+    return f"{day.year}-{day.month:02d}"
+
+
+def months_between(start_date, end_date):
+    """YYYY-MM keys of every month touched by a date range"""
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append(f"{year}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def mark_payroll_dirty(pairs, existing_only=False):
+    """Record that payroll inputs changed for (employee_id, YYYY-MM) pairs
+
+    ``existing_only`` skips employees that no longer exist, e.g. after a cascade delete.
+    """
+    pairs = set(pairs)
+    if existing_only:
+        employee_ids = {employee_id for employee_id, month in pairs}
+        employee_ids = set(
+            Employee.objects.filter(pk__in=employee_ids).values_list('pk', flat=True)
+        )
+        pairs = {pair for pair in pairs if pair[0] in employee_ids}
+    now = timezone.now()
+    rows = [
+        PayrollDirty(employee_id=employee_id, month=month, changed_at=now)
+        for employee_id, month in pairs
+    ]
+    PayrollDirty.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['employee', 'month'],
+        update_fields=['changed_at'],
+    )
+
+
+def parse_month(value):
+    """Parse a YYYY-MM string into a (year, month) tuple"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+    return year, month
+
+
+def attendance_summary(month, employee_ids=None, id_range=None):
+    """Day counts per active employee for a YYYY-MM month"""
+    rows = AttendanceMonthlySummary.objects.filter(
+        month=month,
+        employee__status='A',
+    )
+    if employee_ids is not None:
+        rows = rows.filter(employee_id__in=employee_ids)
+    if id_range is not None:
+        rows = rows.filter(employee__gte=id_range[0], employee__lte=id_range[1])
+    rows = rows.values('employee_id', 'present_days', 'absent_days', 'leave_days')
+    return {row.pop('employee_id'): row for row in rows}
+
+
+def payroll_structures(employee_ids=None, id_range=None):
+    """Salary structures of active employees, optionally limited to some IDs or an ID range
+
+    ``employee_ids`` may be a list or a values() subquery.
+    """
+    structures = SalaryStructure.objects.filter(employee__status='A')
+    if employee_ids is not None:
+        structures = structures.filter(employee_id__in=employee_ids)
+    if id_range is not None:
+        structures = structures.filter(employee__gte=id_range[0], employee__lte=id_range[1])
+    return structures
+
+
+def collect_inputs(month, employee_ids=None, id_range=None):
+    """Salary and attendance inputs for active employees, ordered by employee ID
+
+    ``employee_ids`` (a list or a values() subquery) and ``id_range`` (an
+    inclusive pair of IDs) limit the run to those employees.
+    """
+    summary = attendance_summary(month, employee_ids, id_range)
+    structures = payroll_structures(employee_ids, id_range)
+    structures = structures.values('employee_id', *SALARY_FIELDS).order_by('employee_id')
+    inputs = []
+    for row in structures:
+        row.update(summary.get(row['employee_id'], {}))
+        inputs.append(row)
+    return inputs
+
+
+def plan_deductions(payroll_month, month_start, month_end, employee_ids):
+    """Total the installments a month charges each of the run's employees
+
+    Installments already applied to this month are reused, so re-runs never
+    charge an installment twice. Returns the new DeductionInstallment rows and
+    the Deduction rows whose progress changed, for the caller to write, and the
+    ``{employee_id: amount}`` installment deductions.
+    """
+    employee_ids = set(employee_ids)
+    amounts = defaultdict(lambda: Decimal('0.00'))
+
+    applied = DeductionInstallment.objects.filter(
+        payroll_month=payroll_month
+    ).values_list('deduction__employee_id', 'amount')
+    for employee_id, amount in applied:
+        amounts[employee_id] += amount
+
+    due = Deduction.objects.filter(
+        is_active=True,
+        from_date__lte=month_end,
+        to_date__gte=month_start,
+    ).exclude(installments__payroll_month=payroll_month)
+
+    installments = []
+    deductions = []
+    for deduction in due:
+        if deduction.employee_id not in employee_ids:
+            continue
+        amount = deduction.next_installment()
+        if amount > 0:
+            amounts[deduction.employee_id] += amount
+            installments.append(DeductionInstallment(
+                deduction=deduction, payroll_month=payroll_month, amount=amount
+            ))
+        deduction.record_installment(amount)
+        deductions.append(deduction)
+    return installments, deductions, dict(amounts)
+
+
+def compute_records(inputs, working_days):
+    """Calculate payroll record values for a list of employee inputs"""
+    if payroll_calc.is_available():
+        return compute_records_vectorized(inputs, working_days)
+    values = []
+    for row in inputs:
+        record = PayrollRecord(
+            employee_id=row['employee_id'],
+            working_days=working_days,
+            present_days=row.get('present_days', 0),
+            absent_days=row.get('absent_days', 0),
+            leave_days=row.get('leave_days', 0),
+            **{field: row[field] for field in COMPONENT_FIELDS},
+        )
+        record.calculate_salary()
+        values.append({
+            'employee_id': record.employee_id,
+            **{field: getattr(record, field) for field in RECORD_FIELDS},
+        })
+    return values
+
+
+def compute_records_vectorized(inputs, working_days):
+    """Same values as ``compute_records`` using the int64 paise batch calculator"""
+    totals = payroll_calc.calculate_batch(inputs, working_days)
+    from_paise = payroll_calc.from_paise
+    values = []
+    for i, row in enumerate(inputs):
+        values.append({
+            'employee_id': row['employee_id'],
+            'working_days': working_days,
+            'present_days': row.get('present_days', 0),
+            'absent_days': row.get('absent_days', 0),
+            'leave_days': row.get('leave_days', 0),
+            **{field: row[field] for field in COMPONENT_FIELDS},
+            'gross_salary': from_paise(totals['gross_salary'][i]),
+            'total_deductions': from_paise(totals['total_deductions'][i]),
+            'net_salary': from_paise(totals['net_salary'][i]),
+        })
+    return values
+
+
+def shard_by_id_range(employee_ids, shards):
+    """Split ordered employee IDs into contiguous ID ranges of similar size"""
+    if not employee_ids:
+        return []
+    size = -(-len(employee_ids) // shards)
+    return [employee_ids[i:i + size] for i in range(0, len(employee_ids), size)]
+
+
+def pack_values(values):
+    """Record values as a tuple of ints, amounts in paise, which pickles compactly"""
+    return (
+        values['employee_id'],
+        *(values[field] for field in DAY_FIELDS),
+        *(payroll_calc.to_paise(values[field]) for field in AMOUNT_FIELDS),
+    )
+
+
+def unpack_values(packed):
+    values = dict(zip(['employee_id'] + RECORD_FIELDS, packed))
+    for field in AMOUNT_FIELDS:
+        values[field] = payroll_calc.from_paise(values[field])
+    return values
+
+
+def shard_values(month, id_range, working_days, installments, employee_ids=None):
+    """Record values of the active employees in an inclusive ID range
+
+    Reads its own inputs, so pool workers receive only the range, the shard's
+    installment deductions and, for incremental runs, its employee IDs.
+    """
+    inputs = collect_inputs(month, employee_ids, id_range)
+    for row in inputs:
+        row['installment_deductions'] = installments.get(row['employee_id'], Decimal('0.00'))
+    return compute_records(inputs, working_days)
+
+
+def packed_shard_values(*args):
+    """``shard_values`` packed for the trip back from a pool worker"""
+    return [pack_values(values) for values in shard_values(*args)]
+
+
+def compute_values(month, employee_ids, working_days, installments, workers=1, progress=None,
+                   incremental=False):
+    """Record values for the run's employees, ordered by ID, shard by shard
+
+    ``employee_ids`` must be ordered. Shards are computed across a process pool
+    when workers > 1, each worker reading its own ID range; ``installments``
+    are the ``{employee_id: amount}`` installment deductions of the run.
+    """
+    shards = shard_by_id_range(employee_ids, max(workers, -(-len(employee_ids) // BATCH_SIZE)))
+    tasks = [
+        (
+            month, (shard[0], shard[-1]), working_days,
+            {employee_id: installments[employee_id] for employee_id in shard if employee_id in installments},
+            shard if incremental else None,
+        )
+        for shard in shards
+    ]
+    # Employees added to a range after the IDs were listed wait for the next run
+    wanted = set(employee_ids)
+    values = []
+    with contextlib.ExitStack() as stack:
+        if workers > 1 and len(shards) > 1:
+            pool = stack.enter_context(process_pool(workers))
+            computed = (
+                map(unpack_values, packed) for packed in pool.map(packed_shard_values, *zip(*tasks))
+            )
+        else:
+            computed = itertools.starmap(shard_values, tasks)
+        for shard in computed:
+            values.extend(row for row in shard if row['employee_id'] in wanted)
+            if progress:
+                progress(len(values), len(employee_ids))
+    return values
+
+
+def run_payroll(payroll_month, user=None, workers=1, progress=None, full=False):
+    """Process payroll for every active employee with a few queries per shard of employees
+
+    A month that was already processed only recomputes the employees marked
+    dirty since then, unless ``full`` is set. ``progress`` is called with
+    ``(done, total)`` as employee shards are computed. Queries run by pool
+    workers are not included in the result's query count.
+    """
+    incremental = not full and payroll_month.processing_date is not None
+    result = PayrollRunResult(payroll_month=payroll_month, incremental=incremental)
+    counter = QueryCounter()
+    started = time.perf_counter()
+    run_started_at = timezone.now()
+
+    with connection.execute_wrapper(counter):
+        year, month = parse_month(payroll_month.month)
+        month_start, month_end = month_bounds(year, month)
+
+        # Changes made while this run reads its inputs stay dirty for the next one
+        dirty = PayrollDirty.objects.filter(
+            month=payroll_month.month, changed_at__lte=run_started_at
+        )
+        employee_ids = dirty.values('employee_id') if incremental else None
+
+        run_ids = list(
+            payroll_structures(employee_ids).order_by('employee_id').values_list('employee_id', flat=True)
+        )
+        installments, deductions, amounts = plan_deductions(
+            payroll_month, month_start, month_end, run_ids
+        )
+        existing = set(
+            PayrollRecord.objects.filter(payroll_month=payroll_month)
+            .values_list('employee_id', flat=True)
+        )
+
+        # Reload holidays, they may have changed in another process
+        workdays.clear()
+        working_days = workdays.working_days(year, month)
+        values = compute_values(
+            payroll_month.month, run_ids, working_days, amounts,
+            workers=workers, progress=progress, incremental=incremental,
+        )
+        records = [PayrollRecord(payroll_month=payroll_month, **row) for row in values]
+
+        with transaction.atomic():
+            # Native upsert on (employee, payroll_month) creates and updates in one pass
+            PayrollRecord.objects.bulk_create(
+                records,
+                batch_size=BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['employee', 'payroll_month'],
+                update_fields=RECORD_FIELDS + ['updated_at'],
+            )
+
+            # Installments are recorded with the records they were charged on
+            DeductionInstallment.objects.bulk_create(installments, batch_size=BATCH_SIZE)
+            for deduction in deductions:
+                deduction.updated_at = run_started_at
+            Deduction.objects.bulk_update(
+                deductions, ['installments_paid', 'is_active', 'updated_at'],
+                batch_size=BATCH_SIZE,
+            )
+
+            # Slips for every record of the month that does not have one yet
+            missing_slips = PayrollRecord.objects.filter(
+                payroll_month=payroll_month, salary_slip__isnull=True
+            ).values_list('id', 'employee__employee_id')
+            slips = [
+                SalarySlip(
+                    payroll_record_id=record_id,
+                    slip_number=f"SLIP-{payroll_month.month}-{employee_code}",
+                )
+                for record_id, employee_code in missing_slips
+            ]
+            SalarySlip.objects.bulk_create(slips, batch_size=BATCH_SIZE)
+            dirty.delete()
+
+            payroll_month.status = 'PROCESSED'
+            payroll_month.processing_date = run_started_at
+            if user is not None:
+                payroll_month.processed_by = user
+            payroll_month.save()
+
+    result.employees = len(records)
+    result.updated = sum(1 for record in records if record.employee_id in existing)
+    result.created = result.employees - result.updated
+    result.slips_created = len(slips)
+    result.installments = len(installments)
+    result.query_count = counter.count
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,75 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, callers fall back to the Decimal path
+    np = None
+
+EARNING_FIELDS = [
+    'basic_salary', 'hra', 'dearness_allowance', 'conveyance',
+    'medical_allowance', 'other_allowances',
+]
+
+DEDUCTION_FIELDS = [
+    'pf_contribution', 'esi_contribution', 'income_tax', 'other_deductions',
+    'installment_deductions',
+]
+
+PAISE = Decimal('0.01')
+
+
+def to_paise(value):
+    """Convert a rupee amount with at most two decimal places to integer paise"""
+    if not isinstance(value, Decimal):
+        value = Decimal(value)
+    return int(value * 100)
+
+
+def from_paise(paise):
+    """Convert integer paise back to a two decimal place rupee amount"""
+    return Decimal(int(paise)).scaleb(-2)
+
+
+def prorate(amount, paid_days, working_days):
+    """Scale an amount by paid days over working days, rounded half up to paise"""
+    if not working_days:
+        return amount
+    return (amount * paid_days / working_days).quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def is_available():
+    """Whether the vectorized calculator can be used"""
+    return np is not None
+
+
+def calculate_batch(inputs, working_days):
+    """Gross, deductions, net and prorated net for a batch of employee inputs
+
+    All amounts are handled as int64 paise so sums are exact; proration rounds
+    half away from zero, matching ``prorate`` on Decimal values. Returns a dict
+    of int64 arrays aligned with ``inputs``.
+    """
+    fields = EARNING_FIELDS + DEDUCTION_FIELDS
+    components = np.array(
+        [[to_paise(row[field]) for field in fields] for row in inputs],
+        dtype=np.int64,
+    ).reshape(len(inputs), len(fields))
+    present = np.array([row.get('present_days', 0) for row in inputs], dtype=np.int64)
+
+    gross = components[:, :len(EARNING_FIELDS)].sum(axis=1)
+    total_deductions = components[:, len(EARNING_FIELDS):].sum(axis=1)
+    net = gross - total_deductions
+
+    if working_days:
+        # Integer half-up rounding of net * present / working_days, away from zero
+        scaled = np.abs(net) * present * 2 + working_days
+        prorated = np.sign(net) * (scaled // (2 * working_days))
+    else:
+        prorated = net.copy()
+
+    return {
+        'gross_salary': gross,
+        'total_deductions': total_deductions,
+        'net_salary': net,
+        'prorated_net_salary': prorated,
+    }
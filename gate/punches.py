@@ -0,0 +1,175 @@
+import csv
+import json
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import hours
+from .attendance import fold_punches
+from .models import Employee, PunchEvent
+
+# Punches buffered before they are written and folded into attendance
+BATCH_SIZE = 5000
+
+PUNCH_FORMATS = ['jsonl', 'csv']
+
+_DEVICE_MAX = PunchEvent._meta.get_field('device_id').max_length
+_EVENT_MAX = PunchEvent._meta.get_field('event_id').max_length
+
+
+@dataclass
+class PunchIngestResult:
+    """Counts from one punch ingestion"""
+    received: int = 0
+    stored: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    attendance: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+    def __str__(self):
+        return (
+            f"{self.received} punch(es): {self.stored} stored, {self.duplicates} duplicate, "
+            f"{self.rejected} rejected, {self.attendance} attendance day(s) updated"
+        )
+
+
+def read_punches(lines, fmt='jsonl'):
+    """Parse a stream of text lines into punch dicts; unparseable lines yield None
+
+    Each punch has ``device``, ``event_id``, ``employee`` (the employee code)
+    and an ISO 8601 ``timestamp``; CSV streams carry these as a header row.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def _clean(record):
+    """(device, event_id, employee code, aware datetime) of a punch, or None if invalid"""
+    if not record:
+        return None
+    device = str(record.get('device') or '').strip()
+    event_id = str(record.get('event_id') or '').strip()
+    code = str(record.get('employee') or '').strip()
+    if not (device and event_id and code) or len(device) > _DEVICE_MAX or len(event_id) > _EVENT_MAX:
+        return None
+    try:
+        punched_at = parse_datetime(str(record.get('timestamp') or ''))
+    except ValueError:
+        return None
+    if punched_at is None:
+        return None
+    if timezone.is_naive(punched_at):
+        punched_at = timezone.make_aware(punched_at)
+    return device, event_id, code, punched_at
+
+
+def _assign_days(rows):
+    """Set the attendance day of new punches, in place
+
+    A punch belongs to its local date, unless it is the morning check-out of a
+    night shift the employee checked in to the evening before (see
+    hours.ends_night_shift); that check-in may be stored or in the same batch.
+    """
+    policy = hours.ShiftPolicy.from_settings()
+    rows = sorted(rows, key=lambda row: row.punched_at)
+    for row in rows:
+        row.date = timezone.localdate(row.punched_at)
+    stored = PunchEvent.objects.filter(
+        employee_id__in={row.employee_id for row in rows},
+        date__in={row.date - timedelta(days=1) for row in rows},
+    ).values_list('employee_id', 'date').annotate(first=Min('punched_at')).order_by()
+    first_punches = {(employee_id, day): first for employee_id, day, first in stored}
+    for row in rows:
+        previous = (row.employee_id, row.date - timedelta(days=1))
+        check_in = first_punches.get(previous)
+        if check_in is not None and hours.ends_night_shift(
+            timezone.localtime(check_in).time(), timezone.localtime(row.punched_at).time(), policy,
+        ):
+            row.date = previous[1]
+        key = (row.employee_id, row.date)
+        if key not in first_punches or row.punched_at < first_punches[key]:
+            first_punches[key] = row.punched_at
+
+
+def ingest_punches(records):
+    """Store punches and fold them into attendance, one batch at a time
+
+    Punches are idempotent per (device, event_id): replaying a stream stores
+    and folds nothing new. A night shift's check-out is only recognised once its
+    check-in has been ingested, so streams should arrive in time order.
+    """
+    result = PunchIngestResult()
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == BATCH_SIZE:
+            _ingest_batch(batch, result)
+            batch = []
+    if batch:
+        _ingest_batch(batch, result)
+    return result
+
+
+def _ingest_batch(batch, result):
+    result.received += len(batch)
+    punches = {}
+    for record in batch:
+        cleaned = _clean(record)
+        if cleaned is None:
+            result.rejected += 1
+            continue
+        device, event_id, code, punched_at = cleaned
+        if (device, event_id) in punches:
+            result.duplicates += 1
+            continue
+        punches[(device, event_id)] = (code, punched_at)
+
+    employees = dict(
+        Employee.objects.filter(
+            employee_id__in={code for code, punched_at in punches.values()}
+        ).values_list('employee_id', 'pk')
+    )
+    seen = set(
+        PunchEvent.objects.filter(
+            device_id__in={device for device, event_id in punches},
+            event_id__in={event_id for device, event_id in punches},
+        ).values_list('device_id', 'event_id')
+    )
+
+    rows = []
+    for (device, event_id), (code, punched_at) in punches.items():
+        if code not in employees:
+            result.rejected += 1
+            continue
+        if (device, event_id) in seen:
+            result.duplicates += 1
+            continue
+        rows.append(PunchEvent(
+            device_id=device,
+            event_id=event_id,
+            employee_id=employees[code],
+            punched_at=punched_at,
+        ))
+    _assign_days(rows)
+
+    with transaction.atomic():
+        PunchEvent.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+        result.attendance += fold_punches((row.employee_id, row.date) for row in rows)
+    result.stored += len(rows)
@@ -0,0 +1,205 @@
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Employee
+
+# SQLite FTS5 index over the searchable Employee columns, kept in step with
+# gate_employee by triggers so saves, bulk creates and raw SQL writes all
+# update it. Django rebuilds a SQLite table (dropping its triggers) when a
+# migration alters it; repair() puts them back after every migrate.
+SEARCH_TABLE = 'gate_employee_search'
+SEARCH_TRIGGERS = [f'{SEARCH_TABLE}_ai', f'{SEARCH_TABLE}_ad', f'{SEARCH_TABLE}_au']
+SEARCH_COLUMNS = ['employee_id', 'first_name', 'last_name', 'email']
+
+# Trigram matching needs at least three characters per term
+MIN_TERM_LENGTH = 3
+AUTOCOMPLETE_LIMIT = 10
+
+_COLUMNS = ', '.join(SEARCH_COLUMNS)
+_NEW = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_OLD = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+INSTALL_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        {_COLUMNS}, content='gate_employee', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON gate_employee BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON gate_employee BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF {_COLUMNS} ON gate_employee BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD});
+        INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END""",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+_available = None
+
+
+def install(conn=connection):
+    """Create the index and its triggers if missing and rebuild its contents
+
+    Returns False when the database cannot host it (not SQLite, or an SQLite
+    without the FTS5 trigram tokenizer); search then falls back to icontains.
+    """
+    global _available
+    if conn.vendor != 'sqlite':
+        return False
+    try:
+        with conn.cursor() as cursor:
+            for statement in INSTALL_SQL:
+                cursor.execute(statement)
+    except OperationalError:
+        return False
+    _available = None
+    return True
+
+
+def uninstall(conn=connection):
+    global _available
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for statement in UNINSTALL_SQL:
+            cursor.execute(statement)
+    _available = None
+
+
+def installed_objects(conn=connection):
+    """Names of the index table and triggers present in the database"""
+    if conn.vendor != 'sqlite':
+        return set()
+    names = [SEARCH_TABLE] + SEARCH_TRIGGERS
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names,
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def repair(conn=connection):
+    """Reinstall missing triggers, and rebuild the index they let go stale
+
+    Does nothing while the index itself is absent (not yet migrated, or
+    unavailable on this database). Returns whether anything was repaired.
+    """
+    present = installed_objects(conn)
+    if SEARCH_TABLE not in present or present.issuperset(SEARCH_TRIGGERS):
+        return False
+    return install(conn)
+
+
+def search_available():
+    """Whether the FTS index and all its triggers exist, checked once per process"""
+    global _available
+    if _available is None:
+        _available = installed_objects() == {SEARCH_TABLE, *SEARCH_TRIGGERS}
+    return _available
+
+
+def _match_expression(terms):
+    """FTS5 query requiring every term as a substring, each quoted as a phrase"""
+    return ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _contains_all(terms):
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(employee_id__icontains=term) | Q(first_name__icontains=term)
+            | Q(last_name__icontains=term) | Q(email__icontains=term)
+        )
+    return condition
+
+
+def search_employees(queryset, query):
+    """Filter an Employee queryset to those matching every word of ``query``
+
+    Words long enough for trigrams are matched through the FTS index; shorter
+    ones, or every word when the index is unavailable, with icontains.
+    """
+    terms = query.split()
+    if not search_available():
+        return queryset.filter(_contains_all(terms))
+    indexed = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    short = [term for term in terms if len(term) < MIN_TERM_LENGTH]
+    if indexed:
+        queryset = queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            [_match_expression(indexed)],
+        ))
+    if short:
+        queryset = queryset.filter(_contains_all(short))
+    return queryset
+
+
+def _like(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _matching_ids(match, short, exclude, limit):
+    """IDs of active employees matching an FTS5 query and every short word
+
+    There is no ORDER BY, so SQLite walks the index in rowid order and stops
+    at the limit instead of scoring every match.
+    """
+    sql = [
+        f"SELECT e.id FROM {SEARCH_TABLE} JOIN gate_employee e ON e.id = {SEARCH_TABLE}.rowid",
+        f"WHERE {SEARCH_TABLE} MATCH %s AND e.status = 'A'",
+    ]
+    params = [match]
+    for term in short:
+        sql.append('AND (' + ' OR '.join(f"e.{column} LIKE %s ESCAPE '\\'" for column in SEARCH_COLUMNS) + ')')
+        params += [_like(term)] * len(SEARCH_COLUMNS)
+    if exclude:
+        sql.append(f"AND e.id NOT IN ({', '.join(['%s'] * len(exclude))})")
+        params += exclude
+    sql.append('LIMIT %s')
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def autocomplete(query, limit=AUTOCOMPLETE_LIMIT):
+    """Best matching active employees for a partial query, best first
+
+    Employees whose ID or name starts with the first indexed word rank ahead of
+    those merely containing the words; ties keep the order employees were added.
+    """
+    terms = query.split()
+    if not terms:
+        return []
+    employees = Employee.objects.filter(status='A').select_related('department')
+    if not search_available():
+        # Without the index, prefix matches only, which stop at the limit
+        first = terms[0]
+        prefixed = employees.filter(
+            Q(employee_id__istartswith=first) | Q(first_name__istartswith=first)
+            | Q(last_name__istartswith=first)
+        )
+        return list(prefixed.filter(_contains_all(terms[1:])).order_by('employee_id')[:limit])
+
+    indexed = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    if not indexed:
+        # Trigrams need three characters; anything shorter would scan the table
+        return []
+    short = [term for term in terms if len(term) < MIN_TERM_LENGTH]
+    anywhere = _match_expression(indexed)
+    starting = '{employee_id first_name last_name} : ^' + anywhere
+    ranked = _matching_ids(starting, short, [], limit)
+    if len(ranked) < limit:
+        ranked += _matching_ids(anywhere, short, ranked, limit - len(ranked))
+    found = employees.in_bulk(ranked)
+    return [found[pk] for pk in ranked if pk in found]
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import workdays
+from .attendance import (
+    refresh_day_counts, refresh_summaries, remove_leave_attendance, sync_leave_attendance
+)
+from .leaves import leave_reversals, post_entries, sync_leave_ledger
+from .models import (
+    Attendance, Deduction, Employee, HolidayCalendar, Leave, PayrollMonth,
+    SalaryStructure
+)
+from .payroll import as_date, mark_payroll_dirty, month_key, months_between
+
+
+def _apply(handler, pairs, deleted):
+    if not deleted:
+        handler(pairs)
+        return
+    # Deletes may be part of an employee cascade, so wait for the commit
+    pairs = list(pairs)
+    transaction.on_commit(lambda: handler(pairs, existing_only=True))
+
+
+def _mark_dirty(pairs, deleted):
+    _apply(mark_payroll_dirty, pairs, deleted)
+
+
+@receiver(pre_save, sender=Attendance)
+def attendance_saving(sender, instance, **kwargs):
+    # A row moved to another day or employee also changes the one it leaves
+    instance._stored_day = None
+    if instance.pk is not None:
+        instance._stored_day = Attendance.objects.filter(pk=instance.pk).values_list('employee_id', 'date').first()
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def attendance_changed(sender, instance, **kwargs):
+    days = {(instance.employee_id, as_date(instance.date))}
+    if getattr(instance, '_stored_day', None):
+        days.add(instance._stored_day)
+    pairs = {(employee_id, month_key(day)) for employee_id, day in days}
+    deleted = kwargs['signal'] is post_delete
+    _apply(refresh_summaries, pairs, deleted)
+    _mark_dirty(pairs, deleted)
+    refresh_day_counts(day for employee_id, day in days)
+
+
+@receiver(pre_save, sender=Leave)
+def leave_saving(sender, instance, **kwargs):
+    instance.department_id = instance.employee.department_id
+
+
+@receiver(post_save, sender=Employee)
+def employee_saved(sender, instance, **kwargs):
+    # Leaves list under the employee's current department
+    Leave.objects.filter(employee=instance).exclude(
+        department_id=instance.department_id
+    ).update(department_id=instance.department_id)
+
+
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+def leave_changed(sender, instance, **kwargs):
+    months = months_between(as_date(instance.start_date), as_date(instance.end_date))
+    _mark_dirty([(instance.employee_id, month) for month in months], kwargs['signal'] is post_delete)
+    if kwargs['signal'] is post_save:
+        sync_leave_attendance([instance])
+        sync_leave_ledger([instance])
+
+
+@receiver(pre_delete, sender=Leave)
+def leave_deleted(sender, instance, **kwargs):
+    # Runs before the attendance rows and ledger entries lose their link to the leave
+    remove_leave_attendance([instance.pk])
+    # Posted after the commit, as the leave may be going with its employee
+    reversals = leave_reversals([instance])
+    if reversals:
+        transaction.on_commit(lambda: post_entries(reversals, existing_only=True))
+
+
+@receiver(post_save, sender=Deduction)
+@receiver(post_delete, sender=Deduction)
+def deduction_changed(sender, instance, **kwargs):
+    months = months_between(as_date(instance.from_date), as_date(instance.to_date))
+    _mark_dirty([(instance.employee_id, month) for month in months], kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=SalaryStructure)
+@receiver(post_delete, sender=SalaryStructure)
+def salary_structure_changed(sender, instance, **kwargs):
+    # A new salary applies to every month that has been processed but not yet approved
+    months = PayrollMonth.objects.filter(status='PROCESSED').values_list('month', flat=True)
+    _mark_dirty([(instance.employee_id, month) for month in months], kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=HolidayCalendar)
+@receiver(post_delete, sender=HolidayCalendar)
+def holiday_changed(sender, instance, **kwargs):
+    workdays.clear()
+    # Working days change for everyone in the holiday's month
+    month = month_key(as_date(instance.date))
+    employee_ids = Employee.objects.filter(status='A').values_list('id', flat=True)
+    mark_payroll_dirty((employee_id, month) for employee_id in employee_ids)
+    # Approved leaves covering the day gain or lose their row for it
+    day = as_date(instance.date)
+    leaves = list(Leave.objects.filter(status='A', start_date__lte=day, end_date__gte=day))
+    sync_leave_attendance(leaves)
+    sync_leave_ledger(leaves)
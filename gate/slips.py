@@ -0,0 +1,400 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import SalarySlip
+from .workers import process_pool
+
+# Bump when the PDF layout changes so every cached slip is rendered again
+LAYOUT_VERSION = 1
+
+# Slips rendered per process pool batch
+CHUNK_SIZE = 1000
+
+EARNING_LINES = [
+    ('basic_salary', 'Basic Salary'),
+    ('hra', 'House Rent Allowance (HRA)'),
+    ('dearness_allowance', 'Dearness Allowance (DA)'),
+    ('conveyance', 'Conveyance'),
+    ('medical_allowance', 'Medical Allowance'),
+    ('other_allowances', 'Other Allowances'),
+]
+
+DEDUCTION_LINES = [
+    ('pf_contribution', 'Provident Fund (PF)'),
+    ('esi_contribution', 'ESI Contribution'),
+    ('income_tax', 'Income Tax'),
+    ('other_deductions', 'Other Deductions'),
+    ('installment_deductions', 'Loan / Advance Installments'),
+]
+
+ATTENDANCE_FIELDS = ['working_days', 'present_days', 'leave_days', 'absent_days']
+
+TOTAL_FIELDS = ['gross_salary', 'total_deductions', 'net_salary']
+
+
+def slip_queryset():
+    """Salary slips with everything a rendered slip needs in one join"""
+    return SalarySlip.objects.select_related(
+        'payroll_record__employee__department',
+        'payroll_record__payroll_month',
+    )
+
+
+def slip_payload(salary_slip):
+    """Plain data shown on a salary slip, used both to render and to key the cache"""
+    record = salary_slip.payroll_record
+    employee = record.employee
+    amounts = [field for field, label in EARNING_LINES + DEDUCTION_LINES] + TOTAL_FIELDS
+    return {
+        'layout': LAYOUT_VERSION,
+        'slip_number': salary_slip.slip_number,
+        'issue_date': salary_slip.issue_date.isoformat() if salary_slip.issue_date else '',
+        'month': record.payroll_month.month,
+        'employee_id': employee.employee_id,
+        'employee_name': employee.full_name,
+        'designation': employee.designation,
+        'department': employee.department.name if employee.department else '-',
+        **{field: getattr(record, field) for field in ATTENDANCE_FIELDS},
+        **{field: f"{getattr(record, field):.2f}" for field in amounts},
+    }
+
+
+def slip_key(payload):
+    """Content hash of a slip payload"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def slip_path(key):
+    """Cache location of a rendered slip"""
+    return Path(settings.SALARY_SLIP_DIR) / key[:2] / f"{key}.pdf"
+
+
+# ============= PDF RENDERING =============
+
+# A minimal single-page writer on the standard Helvetica fonts, so no PDF
+# library or font files are needed. Those fonts only cover Windows-1252
+# (WinAnsiEncoding): a slip with any other character, such as a name in Tamil
+# script, is refused rather than drawn with placeholders, and is printed from
+# the HTML slip instead. Text is not wrapped, so very long names or
+# designations run into the next column.
+PDF_ENCODING = 'cp1252'
+
+# Archive entry listing the slips a zip bundle could not include as PDF
+NOT_RENDERED_NAME = 'NOT_RENDERED.txt'
+
+
+class SlipRenderError(ValueError):
+    """A slip holds text the PDF fonts cannot draw"""
+
+
+# Helvetica glyph widths (1/1000 em) for the characters used in amounts
+_AMOUNT_WIDTHS = {',': 278, '.': 278, '-': 333, ' ': 278}
+
+
+def _amount_width(text, size):
+    return sum(_AMOUNT_WIDTHS.get(char, 556) for char in text) * size / 1000
+
+
+def _pdf_string(value):
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _money(value):
+    return f"Rs. {float(value):,.2f}"
+
+
+def build_pdf(texts, rules=()):
+    """Build a single A4 page PDF from positioned text and horizontal rules
+
+    ``texts`` holds ``(x, y, bold, size, text)`` tuples and ``rules``
+    ``(x1, x2, y)`` tuples, in points from the bottom left corner. Raises
+    SlipRenderError for text outside PDF_ENCODING.
+    """
+    ops = []
+    for x1, x2, y in rules:
+        ops.append(f"{x1} {y} m {x2} {y} l S")
+    ops.append('BT')
+    for x, y, bold, size, text in texts:
+        ops.append(f"/{'F2' if bold else 'F1'} {size} Tf 1 0 0 1 {x:.2f} {y} Tm ({_pdf_string(text)}) Tj")
+    ops.append('ET')
+    try:
+        content = '\n'.join(ops).encode(PDF_ENCODING)
+    except UnicodeEncodeError as e:
+        raise SlipRenderError(f"{e.object[e.start:e.end]!r} cannot be drawn with the PDF fonts") from e
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+def render_slip_pdf(payload):
+    """Render a salary slip payload to PDF bytes"""
+    texts = []
+    rules = []
+    left, right, middle = 50, 545, 300
+
+    def amount(x_right, y, value, bold=False, size=10):
+        text = _money(value)
+        texts.append((x_right - _amount_width(text, size) - (size * 0.3), y, bold, size, text))
+
+    texts.append((left, 790, True, 18, 'Gate Garments'))
+    texts.append((left, 772, False, 9, 'Attendance, Payroll & Salary Management System'))
+    texts.append((left, 748, True, 13, f"SALARY SLIP - {payload['month']}"))
+    rules.append((left, right, 738))
+
+    details = [
+        ('Employee Name', payload['employee_name'], 'Department', payload['department']),
+        ('Employee ID', payload['employee_id'], 'Payroll Month', payload['month']),
+        ('Designation', payload['designation'], 'Slip Number', payload['slip_number']),
+    ]
+    y = 716
+    for label, value, other_label, other_value in details:
+        texts.append((left, y, True, 10, f"{label}:"))
+        texts.append((left + 100, y, False, 10, value))
+        texts.append((middle + 10, y, True, 10, f"{other_label}:"))
+        texts.append((middle + 110, y, False, 10, other_value))
+        y -= 18
+
+    y -= 8
+    rules.append((left, right, y + 12))
+    texts.append((left, y - 6, True, 11, 'Attendance Summary'))
+    y -= 26
+    labels = ['Working Days', 'Present Days', 'Leave Days', 'Absent Days']
+    for i, (label, field) in enumerate(zip(labels, ATTENDANCE_FIELDS)):
+        texts.append((left + i * 125, y, False, 9, label))
+        texts.append((left + i * 125, y - 14, True, 11, str(payload[field])))
+    y -= 40
+
+    rules.append((left, right, y + 12))
+    texts.append((left, y - 6, True, 11, 'EARNINGS'))
+    texts.append((middle + 10, y - 6, True, 11, 'DEDUCTIONS'))
+    y -= 26
+    earnings = [(label, payload[field]) for field, label in EARNING_LINES]
+    deductions = [
+        (label, payload[field]) for field, label in DEDUCTION_LINES
+        if field in ('pf_contribution', 'esi_contribution') or float(payload[field]) > 0
+    ]
+    for row in range(max(len(earnings), len(deductions))):
+        if row < len(earnings):
+            texts.append((left, y, False, 10, earnings[row][0]))
+            amount(middle - 10, y, earnings[row][1])
+        if row < len(deductions):
+            texts.append((middle + 10, y, False, 10, deductions[row][0]))
+            amount(right, y, deductions[row][1])
+        y -= 16
+
+    rules.append((left, right, y + 10))
+    texts.append((left, y - 4, True, 10, 'Gross Salary'))
+    amount(middle - 10, y - 4, payload['gross_salary'], bold=True)
+    texts.append((middle + 10, y - 4, True, 10, 'Total Deductions'))
+    amount(right, y - 4, payload['total_deductions'], bold=True)
+    y -= 30
+
+    rules.append((left, right, y + 10))
+    texts.append((left, y - 10, True, 13, 'NET SALARY (Take Home)'))
+    amount(right, y - 10, payload['net_salary'], bold=True, size=14)
+    rules.append((left, right, y - 22))
+
+    texts.append((left, 80, False, 8, 'This is a system-generated salary slip'))
+    texts.append((left, 68, False, 8, f"Generated on: {payload['issue_date']}"))
+    texts.append((left, 56, False, 8, 'Please contact HR for any clarifications'))
+    return build_pdf(texts, rules)
+
+
+# ============= CACHE =============
+
+def write_cached_pdf(payload):
+    """Render a payload into the cache unless an identical slip is already there
+
+    Returns ``(key, rendered)``; raises SlipRenderError when the slip cannot
+    be drawn, before anything is written. Files are written to a temporary name and
+    renamed, so concurrent renderers never expose a partial PDF.
+    """
+    key = slip_key(payload)
+    path = slip_path(key)
+    if path.exists():
+        return key, False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(render_slip_pdf(payload))
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+    return key, True
+
+
+def _render_batch(payloads):
+    """``(key, rendered)`` per payload, with a None key for slips that cannot be drawn"""
+    results = []
+    for payload in payloads:
+        try:
+            results.append(write_cached_pdf(payload))
+        except SlipRenderError:
+            results.append((None, False))
+    return results
+
+
+def cached_slip_pdf(salary_slip):
+    """Path of the PDF for a slip, rendering it first when not cached
+
+    Raises SlipRenderError for slips that need the HTML print view.
+    """
+    key, rendered = write_cached_pdf(slip_payload(salary_slip))
+    if not salary_slip.pdf_generated:
+        SalarySlip.objects.filter(pk=salary_slip.pk).update(
+            pdf_generated=True, generated_date=timezone.now()
+        )
+    return slip_path(key)
+
+
+def generate_month_slips(payroll_month, workers=1):
+    """Render every slip of a payroll month to the PDF cache across a process pool
+
+    Returns ``(total, rendered, unsupported)``; slips whose contents did not
+    change since their last render are served from the cache and not rendered
+    again, and ``unsupported`` counts those the PDF fonts cannot draw.
+    """
+    slips = slip_queryset().filter(payroll_record__payroll_month=payroll_month).order_by('pk')
+    total = rendered = unsupported = 0
+    # Workers write where this process would, even under overridden settings
+    pool = process_pool(workers, ['SALARY_SLIP_DIR']) if workers > 1 else None
+    try:
+        chunk = []
+        for salary_slip in slips.iterator(chunk_size=CHUNK_SIZE):
+            chunk.append(salary_slip)
+            if len(chunk) == CHUNK_SIZE:
+                chunk_rendered, chunk_unsupported = _generate_chunk(chunk, pool, workers)
+                rendered += chunk_rendered
+                unsupported += chunk_unsupported
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            chunk_rendered, chunk_unsupported = _generate_chunk(chunk, pool, workers)
+            rendered += chunk_rendered
+            unsupported += chunk_unsupported
+            total += len(chunk)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return total, rendered, unsupported
+
+
+def _generate_chunk(chunk, pool, workers):
+    payloads = [slip_payload(salary_slip) for salary_slip in chunk]
+    if pool is None:
+        results = _render_batch(payloads)
+    else:
+        size = -(-len(payloads) // workers)
+        batches = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+        results = [result for batch in pool.map(_render_batch, batches) for result in batch]
+
+    now = timezone.now()
+    pending = [
+        salary_slip for salary_slip, (key, was_rendered) in zip(chunk, results)
+        if key is not None and not salary_slip.pdf_generated
+    ]
+    for salary_slip in pending:
+        salary_slip.pdf_generated = True
+        salary_slip.generated_date = now
+        salary_slip.updated_at = now
+    SalarySlip.objects.bulk_update(pending, ['pdf_generated', 'generated_date', 'updated_at'])
+    rendered = sum(1 for key, was_rendered in results if was_rendered)
+    return rendered, sum(1 for key, was_rendered in results if key is None)
+
+
+# ============= ZIP BUNDLES =============
+
+class ZipBuffer:
+    """Write-only file object that hands the written bytes back in pieces
+
+    It has no ``tell``/``seek``, so ``zipfile`` writes entries with data
+    descriptors and the archive can be streamed as it is built.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def month_slips(payroll_month, department=None):
+    """Slips of a payroll month, optionally limited to one department"""
+    slips = slip_queryset().filter(payroll_record__payroll_month=payroll_month)
+    if department is not None:
+        slips = slips.filter(payroll_record__employee__department=department)
+    return slips.order_by('payroll_record__employee__employee_id')
+
+
+def stream_slip_zip(slips):
+    """Yield a zip archive of slip PDFs piece by piece
+
+    Each PDF is taken from the cache, or rendered into it first, and added
+    to the archive one at a time so only a single slip is held in memory.
+    Slips the PDF fonts cannot draw are listed in a NOT_RENDERED_NAME entry.
+    """
+    buffer = ZipBuffer()
+    pending = []
+    unsupported = []
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for salary_slip in slips.iterator(chunk_size=CHUNK_SIZE):
+            try:
+                key, rendered = write_cached_pdf(slip_payload(salary_slip))
+            except SlipRenderError as e:
+                unsupported.append(f"{salary_slip.slip_number}: {e}")
+                continue
+            archive.write(slip_path(key), arcname=f"{salary_slip.slip_number}.pdf")
+            if not salary_slip.pdf_generated:
+                pending.append(salary_slip.pk)
+            yield buffer.take()
+        if unsupported:
+            archive.writestr(NOT_RENDERED_NAME, (
+                'These slips use characters the PDF fonts cannot draw; '
+                'print them from the salary slip page instead.\n\n' + '\n'.join(unsupported) + '\n'
+            ))
+    yield buffer.take()
+
+    if pending:
+        now = timezone.now()
+        SalarySlip.objects.filter(pk__in=pending).update(
+            pdf_generated=True, generated_date=now, updated_at=now
+        )
@@ -1,3 +1,816 @@
-from django.test import TestCase
+import io
+import json
+import random
+import tempfile
+import threading
+import zipfile
+from collections import Counter, defaultdict
+from datetime import date, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.signals import post_migrate
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import daybits, jobs, leaves, payroll_calc, search, workdays
+from .attendance import (
+    SUMMARY_STATUSES, count_day_statuses, day_status_counts, fold_punches, mark_attendance
+)
+from .leaves import accrue_month, decide_leaves
+from .models import (
+    Attendance, AttendanceMonthlySummary, Deduction, Department, Employee, HolidayCalendar, Leave,
+    LeaveBalance, LeaveLedgerEntry, PayrollDirty, PayrollMonth, PayrollRecord, PunchEvent, SalarySlip,
+    SalaryStructure
+)
+from .payroll import (
+    COMPONENT_FIELDS, RECORD_FIELDS, PayrollRunResult, compute_records, compute_values, month_key, run_payroll
+)
+from .punches import ingest_punches
+from .slips import (
+    NOT_RENDERED_NAME, SlipRenderError, generate_month_slips, month_slips, render_slip_pdf, slip_payload,
+    stream_slip_zip
+)
+
+
+def employee_fields(number):
+    return dict(
+        employee_id=f"EMP{number:05d}", first_name=f"First{number}", last_name=f"Last{number}",
+        email=f"emp{number}@example.com", date_of_birth=date(1990, 1, 1), gender='M',
+        designation='Operator', date_of_joining=date(2020, 1, 1),
+        address='1 Mill Road', city='Tiruppur', state='Tamil Nadu', postal_code='641601',
+    )
+
+
+def make_employee(number, **fields):
+    department = Department.objects.get_or_create(name='Production')[0]
+    return Employee.objects.create(department=department, **{**employee_fields(number), **fields})
+
+
+class LeaveAttendanceTests(TestCase):
+    """Attendance rows generated from approved leaves"""
+
+    def setUp(self):
+        self.employee = make_employee(1)
+        # A worked Monday inside the leave, followed by an unmarked Tuesday
+        self.worked = Attendance.objects.create(
+            employee=self.employee, date=date(2026, 3, 2), status='P',
+            check_in_time=time(9), check_out_time=time(17), remarks='worked',
+        )
+        self.leave = Leave.objects.create(
+            employee=self.employee, leave_type='CL', start_date=date(2026, 3, 2),
+            end_date=date(2026, 3, 3), reason='Family function',
+        )
+
+    def test_marked_days_survive_approval_and_rejection(self):
+        self.leave.status = 'A'
+        self.leave.save()
+        self.assertEqual(
+            dict(Attendance.objects.filter(employee=self.employee).values_list('date', 'status')),
+            {date(2026, 3, 2): 'P', date(2026, 3, 3): 'L'},
+        )
+
+        self.leave.status = 'R'
+        self.leave.save()
+        worked = Attendance.objects.get(employee=self.employee)
+        self.assertEqual(worked.pk, self.worked.pk)
+        self.assertEqual(
+            (worked.status, worked.check_in_time, worked.check_out_time, worked.remarks),
+            ('P', time(9), time(17), 'worked'),
+        )
+
+    def test_deleting_a_leave_keeps_days_marked_since(self):
+        self.leave.status = 'A'
+        self.leave.save()
+        Attendance.objects.filter(date=date(2026, 3, 3)).update(status='P', check_in_time=time(9))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leave.delete()
+        self.assertEqual(Attendance.objects.filter(employee=self.employee).count(), 2)
+
+    def test_approval_is_blocked_by_marked_attendance(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.assertEqual(decide_leaves([self.leave.pk], 'approve', admin), [{
+            'id': self.leave.pk, 'result': 'skipped', 'detail': 'Attendance already marked on 1 day(s)',
+        }])
+
+        self.client.force_login(admin)
+        self.client.post(reverse('leave_approve', args=[self.leave.pk]), {'action': 'approve'})
+        self.leave.refresh_from_db()
+        self.assertEqual(self.leave.status, 'P')
+        self.assertFalse(Attendance.objects.filter(status='L').exists())
+
+    def approved_leaves(self):
+        """A one-day leave and a 20-odd working day one in the same month"""
+        return [
+            Leave.objects.create(
+                employee=self.employee, leave_type='EL', start_date=start_date,
+                end_date=end_date, reason='Travel', status='A',
+            )
+            for start_date, end_date in [(date(2026, 4, 1), date(2026, 4, 1)), (date(2026, 4, 2), date(2026, 4, 30))]
+        ]
+
+    def count_queries(self, change):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+        return len(queries)
+
+    def reject(self, leave):
+        leave.status = 'R'
+        leave.save()
+
+    def test_removal_queries_do_not_grow_with_leave_length(self):
+        short, long = self.approved_leaves()
+        self.assertGreater(Attendance.objects.filter(leave=long).count(), 20)
+        self.assertEqual(self.count_queries(lambda: self.reject(long)), self.count_queries(lambda: self.reject(short)))
+        self.assertFalse(Attendance.objects.filter(status='L').exists())
+
+        short, long = self.approved_leaves()
+        self.assertEqual(self.count_queries(long.delete), self.count_queries(short.delete))
+        self.assertFalse(Attendance.objects.filter(status='L').exists())
+        self.assertFalse(AttendanceMonthlySummary.objects.filter(month=date(2026, 4, 1)).exists())
+
+
+class AttendanceMarkingTests(TestCase):
+    """Bulk attendance submissions"""
+
+    def setUp(self):
+        self.employees = [make_employee(number) for number in range(1, 4)]
+        self.day = date(2026, 3, 2)
+
+    def statuses(self):
+        return dict(Attendance.objects.values_list('employee_id', 'status'))
+
+    def test_upserts_known_employees_and_counts_the_rest(self):
+        first, second, third = (employee.pk for employee in self.employees)
+        Attendance.objects.create(employee_id=first, date=self.day, status='A', check_in_time=time(9))
+        marked = mark_attendance(self.day, {
+            str(first): 'P', str(second): 'H', str(third): 'X', '999': 'P', 'abc': 'P',
+        })
+        self.assertEqual(marked, (2, 3))
+        self.assertEqual(self.statuses(), {first: 'P', second: 'H'})
+        # The upsert changes the status and keeps the rest of the row
+        self.assertEqual(Attendance.objects.get(employee_id=first).check_in_time, time(9))
+        self.assertEqual(
+            AttendanceMonthlySummary.objects.get(employee_id=second, month='2026-03').half_days, 1
+        )
+
+    def test_ajax_submissions_report_their_counts(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        def post(statuses):
+            return self.client.post(
+                reverse('attendance_view'),
+                {f"attendance[{employee_id}]": status for employee_id, status in statuses.items()},
+                headers={'X-Requested-With': 'XMLHttpRequest'},
+            )
+
+        response = post({employee.pk: 'P' for employee in self.employees})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'status': 'success', 'message': 'Attendance marked successfully for 3 employee(s)',
+        })
+
+        response = post({self.employees[0].pk: 'A', 999: 'P', 'abc': 'P'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'status': 'partial', 'message': 'Marked 1 employee(s), 2 failed'})
+        self.assertEqual(self.statuses(), {
+            self.employees[0].pk: 'A', self.employees[1].pk: 'P', self.employees[2].pk: 'P',
+        })
+
+
+class AttendanceCacheTests(TestCase):
+    """Monthly summaries and cached day counts follow every kind of attendance change"""
+
+    def setUp(self):
+        cache.clear()
+        self.employees = [make_employee(number) for number in range(1, 3)]
+        self.days = [date(2026, 3, 2), date(2026, 3, 3), date(2026, 4, 1)]
+        for day in self.days:
+            day_status_counts(day)
+
+    def change(self, change):
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertCachesMatchAttendance()
+
+    def assertCachesMatchAttendance(self):
+        counts = defaultdict(Counter)
+        for employee_id, day, status in Attendance.objects.values_list('employee_id', 'date', 'status'):
+            counts[(employee_id, month_key(day))][status] += 1
+        self.assertEqual(
+            {
+                (summary.employee_id, summary.month): {field: getattr(summary, field) for field in SUMMARY_STATUSES}
+                for summary in AttendanceMonthlySummary.objects.all()
+            },
+            {
+                key: {field: sum(statuses[code] for code in codes) for field, codes in SUMMARY_STATUSES.items()}
+                for key, statuses in counts.items()
+            },
+        )
+        for day in self.days:
+            self.assertEqual(day_status_counts(day), count_day_statuses(day))
+
+    def test_edits_and_deletes(self):
+        first, second = self.employees
+        rows = {}
+
+        def create():
+            for employee, day, status in [(first, 0, 'P'), (first, 1, 'A'), (second, 0, 'H'), (second, 2, 'P')]:
+                rows[employee, day] = Attendance.objects.create(employee=employee, date=self.days[day], status=status)
+        self.change(create)
+
+        def edit(row, **fields):
+            for name, value in fields.items():
+                setattr(row, name, value)
+            row.save()
+        self.change(lambda: edit(rows[first, 1], status='WFH'))
+        self.change(rows[first, 0].delete)
+        # Rows moved to another month or employee leave their old day behind
+        self.change(lambda: edit(rows[second, 2], date=self.days[1]))
+        self.change(lambda: edit(rows[second, 0], employee=first))
+        self.change(Attendance.objects.filter(employee=second).delete)
+        self.change(lambda: mark_attendance(self.days[0], {first.pk: 'P', second.pk: 'A'}))
+
+        leave = Leave.objects.create(
+            employee=second, leave_type='CL', start_date=self.days[1], end_date=self.days[2], reason='Wedding',
+        )
+
+        def decide(status):
+            leave.status = status
+            leave.save()
+        self.change(lambda: decide('A'))
+        self.assertEqual(count_day_statuses(self.days[2])['L'], 1)
+        self.change(lambda: decide('R'))
+        self.change(lambda: decide('A'))
+        self.change(leave.delete)
+
+
+class LeaveListTests(TestCase):
+    """Paging the leave list by department"""
+
+    def test_department_filter_follows_the_employee(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        employee = make_employee(1)
+        leave = Leave.objects.create(
+            employee=employee, leave_type='SL', start_date=date(2026, 3, 9),
+            end_date=date(2026, 3, 9), reason='Fever',
+        )
+        finishing = Department.objects.create(name='Finishing')
+
+        self.client.force_login(admin)
+
+        def listed(department):
+            response = self.client.get(reverse('leave_list'), {'department': department.pk, 'format': 'json'})
+            return [row['id'] for row in response.json()['leaves']]
+
+        self.assertEqual(listed(employee.department), [leave.pk])
+        employee.department = finishing
+        employee.save()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(listed(finishing), [leave.pk])
+        # Paged straight off the department index, without counting its employees
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        self.assertEqual(listed(Department.objects.get(name='Production')), [])
+
+
+class LeaveLedgerTests(TestCase):
+    """Leave balances move only through ledger entries"""
+
+    def setUp(self):
+        self.employee = make_employee(1)
+
+    def assertBalances(self, expected):
+        balances = dict(LeaveBalance.objects.filter(employee=self.employee).values_list('leave_type', 'balance'))
+        entries = dict(
+            LeaveLedgerEntry.objects.filter(employee=self.employee)
+            .values_list('leave_type').annotate(total=Sum('days')).order_by()
+        )
+        self.assertEqual(balances, entries)
+        self.assertEqual(balances, {leave_type: Decimal(days) for leave_type, days in expected.items()})
+
+    def test_balance_is_the_sum_of_entries_through_approve_cancel_and_accrue(self):
+        accrue_month('2026-03')
+        accrue_month('2026-03')
+        self.assertBalances({'SL': '1.00', 'CL': '0.83'})
+
+        # Monday to Wednesday
+        leave = Leave.objects.create(
+            employee=self.employee, leave_type='CL', start_date=date(2026, 3, 9),
+            end_date=date(2026, 3, 11), reason='Wedding',
+        )
+        leave.status = 'A'
+        leave.save()
+        self.assertBalances({'SL': '1.00', 'CL': '-2.17'})
+        leave.end_date = date(2026, 3, 12)
+        leave.save()
+        self.assertBalances({'SL': '1.00', 'CL': '-3.17'})
+        leave.status = 'R'
+        leave.save()
+        self.assertBalances({'SL': '1.00', 'CL': '0.83'})
+
+        leave.status = 'A'
+        leave.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.delete()
+        self.assertBalances({'SL': '1.00', 'CL': '0.83'})
+
+        accrue_month('2026-04')
+        self.assertBalances({'SL': '2.00', 'CL': '1.66'})
+
+
+class LeaveConflictTests(TestCase):
+    """Approved leaves and marked days that block approving pending leaves"""
+
+    def leave(self, employee, start, end, status='P'):
+        return Leave.objects.create(
+            employee=employee, leave_type='CL', start_date=date(2026, 3, start),
+            end_date=date(2026, 3, end), reason='Personal', status=status,
+        )
+
+    def test_only_days_within_each_employees_leaves_conflict(self):
+        first, second, third = make_employee(1), make_employee(2), make_employee(3)
+        for employee, day in [(first, 10), (first, 21), (second, 5), (second, 6), (third, 12)]:
+            Attendance.objects.create(employee=employee, date=date(2026, 3, day), status='P')
+        approved = self.leave(first, 1, 25, status='A')
+        early, late, single = self.leave(first, 2, 3), self.leave(first, 20, 21), self.leave(second, 5, 5)
+        self.leave(third, 2, 3)
+
+        # One range per query, so the long approved leave is read twice
+        with mock.patch.object(leaves, 'CONFLICT_RANGES_PER_QUERY', 1):
+            conflicts = leaves.leave_conflicts(Leave.objects.filter(status='P'))
+        self.assertEqual(
+            {pk: (found.leaves, found.attendance_days) for pk, found in conflicts.items()},
+            {
+                early.pk: ([approved], []),
+                late.pk: ([approved], [date(2026, 3, 21)]),
+                single.pk: ([], [date(2026, 3, 5)]),
+            },
+        )
+
+
+class DecideLeavesTests(TestCase):
+    """Bulk approval and rejection of leaves"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.clerk = User.objects.create_user('clerk')
+        self.leaves = {}
+        for number, status in enumerate(['P', 'P', 'A', 'R'], start=1):
+            self.leaves[number] = Leave.objects.create(
+                employee=make_employee(number), leave_type='SL', start_date=date(2026, 3, 9),
+                end_date=date(2026, 3, 10), reason='Fever', status=status, approved_by=self.clerk,
+            )
+        self.posted = LeaveLedgerEntry.objects.count()
+
+    def test_only_pending_leaves_are_decided(self):
+        ids = [leave.pk for leave in self.leaves.values()]
+        results = decide_leaves(ids + [ids[0], 0], 'approve', self.admin)
+        self.assertEqual([(result['id'], result['result'], result['detail']) for result in results], [
+            (ids[0], 'approved', ''),
+            (ids[1], 'approved', ''),
+            (ids[2], 'skipped', 'Already approved'),
+            (ids[3], 'skipped', 'Already rejected'),
+            (0, 'skipped', 'Leave not found'),
+        ])
+        self.assertEqual(
+            list(Leave.objects.order_by('pk').values_list('status', 'approved_by__username')),
+            [('A', 'admin'), ('A', 'admin'), ('A', 'clerk'), ('R', 'clerk')],
+        )
+        entries = LeaveLedgerEntry.objects.order_by('pk')[self.posted:]
+        self.assertEqual(
+            [(entry.leave_id, entry.kind, entry.days) for entry in entries],
+            [(ids[0], 'DEBIT', Decimal('-2.00')), (ids[1], 'DEBIT', Decimal('-2.00'))],
+        )
+        self.assertEqual(
+            dict(LeaveBalance.objects.filter(leave_type='SL').values_list('employee_id', 'balance')),
+            {leave.employee_id: Decimal('-2.00') for leave in self.leaves.values() if leave.status != 'R'},
+        )
+        self.assertEqual(Attendance.objects.filter(status='L').count(), 6)
+
+        self.assertEqual(decide_leaves(ids[:2], 'reject', self.admin)[0]['detail'], 'Already approved')
+        self.assertEqual(LeaveLedgerEntry.objects.count(), self.posted + 2)
+
+    def test_rejecting_posts_nothing(self):
+        results = decide_leaves([self.leaves[1].pk], 'reject', self.admin)
+        self.assertEqual(results[0]['result'], 'rejected')
+        self.assertEqual(LeaveLedgerEntry.objects.count(), self.posted)
+        self.assertFalse(Attendance.objects.filter(status='L').filter(employee=self.leaves[1].employee).exists())
+
+    def test_admin_actions_report_what_they_did(self):
+        self.client.force_login(self.admin)
+        for action, number, verb in [('reject_selected', 1, 'rejected'), ('approve_selected', 2, 'approved')]:
+            response = self.client.post(reverse('admin:gate_leave_changelist'), {
+                'action': action, '_selected_action': [self.leaves[number].pk],
+            }, follow=True)
+            self.assertEqual([str(message) for message in response.context['messages']], [f"1 leave(s) {verb}"])
+
+
+def punch(event_id, employee, timestamp):
+    return {'device': 'GATE-1', 'event_id': event_id, 'employee': employee.employee_id, 'timestamp': timestamp}
+
+
+class PunchIngestTests(TestCase):
+    """Folding device punches into attendance days"""
+
+    def setUp(self):
+        self.employee = make_employee(1)
+
+    def attendance(self):
+        return list(Attendance.objects.filter(employee=self.employee).order_by('date').values_list(
+            'date', 'status', 'check_in_time', 'check_out_time',
+        ))
+
+    @override_settings(GATE_PUNCH_API_KEY='device-secret')
+    def test_only_devices_skip_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_user('clerk', is_staff=True))
+        body = json.dumps(punch('1', self.employee, '2026-03-02T08:55:00'))
+
+        def post(**headers):
+            return client.post(reverse('punch_ingest'), body, content_type='application/jsonl', headers=headers)
+
+        # A forged cross-site post rides the staff session without a token
+        self.assertEqual(post().status_code, 403)
+        self.assertFalse(PunchEvent.objects.exists())
+
+        token = 'a' * 32
+        client.cookies['csrftoken'] = token
+        self.assertEqual(post(X_CSRFToken=token).json()['stored'], 1)
+
+        client.logout()
+        client.cookies.clear()
+        self.assertEqual(post(Authorization='Token wrong').status_code, 403)
+        response = post(Authorization='Token device-secret')
+        self.assertEqual((response.json()['received'], response.json()['duplicates']), (1, 1))
+
+    def test_night_shift_folds_into_the_day_it_started(self):
+        ingest_punches([
+            punch('1', self.employee, '2026-03-02T21:02:00'),
+            punch('2', self.employee, '2026-03-03T05:10:00'),
+        ])
+        self.assertEqual(self.attendance(), [(date(2026, 3, 2), 'P', time(21, 2), time(5, 10))])
+        summary = AttendanceMonthlySummary.objects.get(employee=self.employee, month='2026-03')
+        self.assertEqual((summary.present_days, summary.worked_minutes), (1, 488))
+
+    def test_night_shift_check_out_in_a_later_stream(self):
+        ingest_punches([punch('1', self.employee, '2026-03-02T21:02:00')])
+        ingest_punches([
+            punch('2', self.employee, '2026-03-03T05:10:00'),
+            punch('3', self.employee, '2026-03-03T20:58:00'),
+        ])
+        self.assertEqual(self.attendance(), [
+            (date(2026, 3, 2), 'P', time(21, 2), time(5, 10)),
+            (date(2026, 3, 3), 'P', time(20, 58), None),
+        ])
+
+    def test_day_shift_next_morning_opens_a_new_day(self):
+        ingest_punches([
+            punch('1', self.employee, '2026-03-02T09:00:00'),
+            punch('2', self.employee, '2026-03-02T17:05:00'),
+            punch('3', self.employee, '2026-03-03T08:55:00'),
+        ])
+        self.assertEqual(self.attendance(), [
+            (date(2026, 3, 2), 'P', time(9), time(17, 5)),
+            (date(2026, 3, 3), 'P', time(8, 55), None),
+        ])
+
+
+    def test_reingesting_a_batch_changes_nothing(self):
+        batch = [
+            punch('1', self.employee, '2026-03-02T08:58:00'),
+            punch('2', self.employee, '2026-03-02T13:01:00'),
+            punch('3', self.employee, '2026-03-02T17:04:00'),
+            punch('4', self.employee, '2026-03-02T21:00:00'),
+            punch('5', self.employee, '2026-03-03T05:02:00'),
+        ]
+        first = ingest_punches(batch)
+        stored = list(Attendance.objects.filter(employee=self.employee).order_by('date').values())
+
+        again = ingest_punches(batch + batch[:2])
+        self.assertEqual((first.stored, first.attendance), (5, 2))
+        self.assertEqual((again.stored, again.duplicates, again.attendance), (0, 7, 0))
+        self.assertEqual(list(Attendance.objects.filter(employee=self.employee).order_by('date').values()), stored)
+        self.assertEqual(PunchEvent.objects.count(), 5)
+
+        # Folding the same days again rewrites the same times
+        fold_punches([(self.employee.pk, date(2026, 3, 2)), (self.employee.pk, date(2026, 3, 3))])
+        refolded = Attendance.objects.filter(employee=self.employee).order_by('date')
+        self.assertEqual(
+            list(refolded.values_list('date', 'status', 'check_in_time', 'check_out_time')),
+            [(row['date'], row['status'], row['check_in_time'], row['check_out_time']) for row in stored],
+        )
+
+
+class DayBitsTests(SimpleTestCase):
+    """Packing a month's attendance statuses into a 12-byte blob"""
+
+    def test_round_trip_for_every_status_and_month_length(self):
+        statuses = daybits.STATUSES[1:]
+        rng = random.Random(14)
+        for days in (28, 29, 30, 31):
+            months = [{day: status for day in range(1, days + 1)} for status in statuses]
+            months.append({day: statuses[day % len(statuses)] for day in range(1, days + 1)})
+            months.append({day: rng.choice(statuses) for day in rng.sample(range(1, days + 1), days // 2)})
+            months.append({})
+            for month in months:
+                blob = daybits.encode(month)
+                self.assertEqual(len(blob), daybits.BLOB_SIZE)
+                self.assertEqual(daybits.decode(blob), month)
+                self.assertEqual(daybits.count(blob, 1, days), Counter(month.values()))
+                self.assertEqual(
+                    daybits.code_string(blob, days),
+                    ''.join(str(daybits.CODES.get(month.get(day), 0)) for day in range(1, days + 1)),
+                )
+            blobs = [daybits.encode(month) for month in months]
+            self.assertEqual(daybits.code_rows(blobs, days), [daybits.code_string(blob, days) for blob in blobs])
+
+    def test_unknown_status_and_day_are_rejected(self):
+        with self.assertRaises(ValueError):
+            daybits.encode({1: 'X'})
+        with self.assertRaises(ValueError):
+            daybits.encode({32: 'P'})
+
+
+@skipUnless(payroll_calc.is_available(), 'NumPy is not installed')
+class PayrollCalculatorTests(SimpleTestCase):
+    """The int64 paise calculator against the per-record Decimal path"""
+
+    def test_totals_match_the_decimal_path_to_the_paisa(self):
+        rng = random.Random(5)
+
+        def amount(high):
+            return Decimal(rng.randint(0, high * 100)).scaleb(-2)
+
+        inputs = [
+            {
+                'employee_id': number, 'present_days': rng.randint(0, 26),
+                **{field: amount(40000) for field in COMPONENT_FIELDS},
+            }
+            for number in range(2000)
+        ]
+        # Odd paise everywhere, a net of zero, and deductions above earnings
+        inputs.append({'employee_id': 2000, **dict.fromkeys(COMPONENT_FIELDS, Decimal('0.01'))})
+        inputs.append({'employee_id': 2001, **dict.fromkeys(COMPONENT_FIELDS, Decimal('0.00')),
+                       'basic_salary': Decimal('100.05'), 'income_tax': Decimal('9999999.99')})
+
+        vectorized = compute_records(inputs, 26)
+        with mock.patch.object(payroll_calc, 'np', None):
+            decimal = compute_records(inputs, 26)
+        self.assertEqual(vectorized, decimal)
+        self.assertEqual(decimal[-1]['net_salary'], Decimal('-9999899.94'))
+        self.assertEqual(decimal[-2]['net_salary'], Decimal('0.01'))
+
+        # Proration, with nets of +5 and -5 paise whose share of a day is half a paisa
+        inputs += [
+            {'employee_id': 2002 + number, **dict.fromkeys(COMPONENT_FIELDS, Decimal('0.00')),
+             'basic_salary': Decimal('0.05'), 'income_tax': income_tax, 'present_days': 1}
+            for number, income_tax in enumerate([Decimal('0.00'), Decimal('0.10')])
+        ]
+        with mock.patch.object(payroll_calc, 'np', None):
+            nets = [values['net_salary'] for values in compute_records(inputs, 26)]
+        for working_days in (26, 10, 0):
+            totals = payroll_calc.calculate_batch(inputs, working_days)
+            self.assertEqual(
+                [payroll_calc.from_paise(paise) for paise in totals['prorated_net_salary']],
+                [payroll_calc.prorate(net, row.get('present_days', 0), working_days)
+                 for row, net in zip(inputs, nets)],
+            )
+        prorated = payroll_calc.calculate_batch(inputs, 10)['prorated_net_salary']
+        self.assertEqual(list(prorated[-2:]), [1, -1])
+
+
+class PayrollShardingTests(TransactionTestCase):
+    """Pool workers read and compute their own shards of a payroll run"""
+
+    def setUp(self):
+        department = Department.objects.create(name='Production')
+        employees = Employee.objects.bulk_create([
+            Employee(department=department, **employee_fields(number)) for number in range(1, 1201)
+        ])
+        SalaryStructure.objects.bulk_create([
+            SalaryStructure(
+                employee=employee, basic_salary=Decimal(10000 + employee.pk * 7) / 3,
+                hra=Decimal('1234.57'), pf_contribution=Decimal('800.33'),
+            )
+            for employee in employees
+        ])
+        AttendanceMonthlySummary.objects.bulk_create([
+            AttendanceMonthlySummary(
+                employee=employee, month='2026-03', present_days=employee.pk % 23,
+                absent_days=3, leave_days=1,
+            )
+            for employee in employees[::3]
+        ])
+        Deduction.objects.create(
+            employee=employees[700], deduction_type='LOAN', amount=Decimal('5000.00'),
+            from_date=date(2026, 1, 1), to_date=date(2026, 12, 31),
+            number_of_installments=4, monthly_installment=Decimal('1250.00'),
+        )
+        self.employee_ids = [employee.pk for employee in employees]
+
+    def test_parallel_values_match_serial(self):
+        installments = {self.employee_ids[700]: Decimal('1250.00')}
+        serial = compute_values('2026-03', self.employee_ids, 21, installments)
+        parallel = compute_values('2026-03', self.employee_ids, 21, installments, workers=2)
+        self.assertEqual(len(serial), 1200)
+        self.assertEqual(parallel, serial)
+
+    def test_parallel_run_writes_the_serial_records(self):
+        def records():
+            return list(PayrollRecord.objects.order_by('employee_id').values_list(
+                'employee_id', *RECORD_FIELDS,
+            ))
+
+        payroll_month = PayrollMonth.objects.create(month='2026-03', year=2026)
+        run_payroll(payroll_month)
+        serial = records()
+        run_payroll(payroll_month, workers=2, full=True)
+        self.assertEqual(records(), serial)
+        self.assertEqual(serial[700][RECORD_FIELDS.index('installment_deductions') + 1], Decimal('1250.00'))
+
+
+class IncrementalPayrollTests(TestCase):
+    """Re-runs recompute only the employee-months marked dirty"""
+
+    def test_rerun_recomputes_only_the_changed_employee(self):
+        employees = [make_employee(number) for number in range(1, 4)]
+        for employee in employees:
+            SalaryStructure.objects.create(employee=employee, basic_salary=Decimal('15000.00'))
+        payroll_month = PayrollMonth.objects.create(month='2026-03', year=2026)
+        self.assertEqual(run_payroll(payroll_month).employees, 3)
+        before = {record.employee_id: record for record in PayrollRecord.objects.all()}
+        self.assertFalse(PayrollDirty.objects.exists())
+
+        changed = employees[1]
+        Attendance.objects.create(employee=changed, date=date(2026, 3, 5), status='P')
+        # Another month's mark is left for that month's run
+        Attendance.objects.create(employee=employees[0], date=date(2026, 4, 6), status='P')
+        self.assertEqual(
+            sorted(PayrollDirty.objects.values_list('employee_id', 'month')),
+            [(employees[0].pk, '2026-04'), (changed.pk, '2026-03')],
+        )
+
+        result = run_payroll(payroll_month)
+        self.assertTrue(result.incremental)
+        self.assertEqual((result.employees, result.created, result.updated), (1, 0, 1))
+        after = {record.employee_id: record for record in PayrollRecord.objects.all()}
+        self.assertEqual(after[changed.pk].present_days, 1)
+        self.assertGreater(after[changed.pk].updated_at, before[changed.pk].updated_at)
+        for employee in (employees[0], employees[2]):
+            self.assertEqual(after[employee.pk].updated_at, before[employee.pk].updated_at)
+            self.assertEqual(after[employee.pk].present_days, 0)
+        self.assertEqual(list(PayrollDirty.objects.values_list('employee_id', 'month')), [(employees[0].pk, '2026-04')])
+
+
+class DeductionInstallmentTests(TestCase):
+    """Installments charged by payroll runs"""
+
+    def test_nothing_due_counts_no_installment(self):
+        employee = make_employee(1)
+        SalaryStructure.objects.create(employee=employee, basic_salary=Decimal('15000.00'))
+        deduction = dict(
+            employee=employee, from_date=date(2026, 1, 1), to_date=date(2026, 12, 31),
+        )
+        # Fully recovered but still active, and an adjustment of nothing
+        repaid = Deduction.objects.create(
+            deduction_type='LOAN', amount=Decimal('2500.00'), number_of_installments=3,
+            monthly_installment=Decimal('1250.00'), installments_paid=2, **deduction,
+        )
+        empty = Deduction.objects.create(deduction_type='ADJUSTMENT', amount=Decimal('0.00'), **deduction)
+
+        result = run_payroll(PayrollMonth.objects.create(month='2026-03', year=2026))
+        self.assertEqual(result.installments, 0)
+        self.assertEqual(
+            list(Deduction.objects.filter(pk__in=[repaid.pk, empty.pk]).order_by('pk').values_list(
+                'installments_paid', 'is_active',
+            )),
+            [(2, False), (0, False)],
+        )
+
+
+class EmployeeSearchTests(TestCase):
+    """The FTS index and the triggers that keep it current"""
+
+    def tearDown(self):
+        search._available = None
+
+    def test_missing_trigger_is_reinstalled_after_migrate(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {search.SEARCH_TABLE}_ai")
+        search._available = None
+        self.assertFalse(search.search_available())
+
+        make_employee(1, first_name='Kavitha')
+        post_migrate.send(sender=apps.get_app_config('gate'), app_config=apps.get_app_config('gate'),
+                          verbosity=0, interactive=False, using='default', apps=apps, plan=[])
+        self.assertTrue(search.search_available())
+        self.assertEqual(
+            list(search.search_employees(Employee.objects.all(), 'avith').values_list('first_name', flat=True)),
+            ['Kavitha'],
+        )
+
+
+class WorkdaysCacheTests(TestCase):
+    """Memoized holidays follow changes made in other processes"""
+
+    def setUp(self):
+        workdays.clear()
+
+    def test_holiday_changed_elsewhere_is_seen_after_the_version_check(self):
+        self.assertEqual(workdays.working_days(2026, 3), 26)
+        # Writes without signals, as another process's would look from here
+        HolidayCalendar.objects.bulk_create([HolidayCalendar(date=date(2026, 3, 4), name='Festival')])
+        self.assertEqual(workdays.working_days(2026, 3), 26)
+
+        workdays._checked_at -= workdays.VERSION_CHECK_SECONDS
+        self.assertEqual(workdays.working_days(2026, 3), 25)
+
+        HolidayCalendar.objects.filter(date=date(2026, 3, 4)).update(date=date(2026, 3, 5), updated_at=timezone.now())
+        workdays._checked_at -= workdays.VERSION_CHECK_SECONDS
+        self.assertTrue(workdays.is_working_day(date(2026, 3, 4)))
+        self.assertFalse(workdays.is_working_day(date(2026, 3, 5)))
+
+
+class SalarySlipPdfTests(TestCase):
+    """The PDF slip writer and its character set limit"""
+
+    def setUp(self):
+        self.slip_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.slip_dir.cleanup)
+        settings = override_settings(SALARY_SLIP_DIR=self.slip_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.payroll_month = PayrollMonth.objects.create(month='2026-03', year=2026)
+        self.latin = self.make_slip(1, 'José', 'Müller')
+        self.tamil = self.make_slip(2, 'கவிதா', 'Raman')
+
+    def make_slip(self, number, first_name, last_name):
+        employee = make_employee(number, first_name=first_name, last_name=last_name)
+        record = PayrollRecord.objects.create(
+            employee=employee, payroll_month=self.payroll_month, basic_salary=Decimal('15000.00'),
+        )
+        return SalarySlip.objects.create(payroll_record=record, slip_number=f"SLIP-2026-03-{number}")
+
+    def test_latin_text_is_drawn_in_windows_1252(self):
+        pdf = render_slip_pdf(slip_payload(self.latin))
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertIn('(José Müller) Tj'.encode('cp1252'), pdf)
+        self.assertNotIn(b'?', pdf.replace(b'%PDF', b''))
+
+    def test_other_scripts_are_refused_not_replaced(self):
+        with self.assertRaisesMessage(SlipRenderError, "'கவிதா' cannot be drawn"):
+            render_slip_pdf(slip_payload(self.tamil))
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('salary_slip_view', args=[self.tamil.pk]) + '?format=pdf')
+        self.assertContains(response, 'Use Print to save it as a PDF instead')
+        self.tamil.refresh_from_db()
+        self.assertFalse(self.tamil.pdf_generated)
+
+    def test_bulk_renders_count_and_zips_list_the_slips_left_out(self):
+        self.assertEqual(generate_month_slips(self.payroll_month), (2, 1, 1))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_slip_zip(month_slips(self.payroll_month)))))
+        self.assertEqual(archive.namelist(), ['SLIP-2026-03-1.pdf', NOT_RENDERED_NAME])
+        self.assertIn('SLIP-2026-03-2', archive.read(NOT_RENDERED_NAME).decode())
+        self.assertEqual(
+            dict(SalarySlip.objects.values_list('slip_number', 'pdf_generated')),
+            {'SLIP-2026-03-1': True, 'SLIP-2026-03-2': False},
+        )
+
+    def test_pool_workers_write_to_the_current_slip_dir(self):
+        self.assertEqual(generate_month_slips(self.payroll_month, workers=2), (2, 1, 1))
+        self.assertEqual(len(list(Path(self.slip_dir.name).glob('*/*.pdf'))), 1)
+        # Already cached, so nothing is rendered again
+        self.assertEqual(generate_month_slips(self.payroll_month), (2, 0, 1))
+
+
+class PayrollJobTests(TransactionTestCase):
+    """Payroll jobs run by the worker"""
+
+    def test_heartbeat_keeps_a_quiet_run_from_being_requeued(self):
+        payroll_month = PayrollMonth.objects.create(month='2026-03', year=2026)
+        jobs.submit_payroll_job(payroll_month)
+        job = jobs.claim_next_job()
+        requeued = []
+
+        def quiet_run(*args, **kwargs):
+            # No progress is reported, as while a run writes its records
+            threading.Event().wait(0.5)
+            requeued.append(jobs.requeue_stale_jobs(stale_after=timedelta(seconds=0.3)))
+            return PayrollRunResult(payroll_month=payroll_month)
+
+        with mock.patch.object(jobs, 'HEARTBEAT_INTERVAL', 0.1), mock.patch.object(jobs, 'run_payroll', quiet_run):
+            job = jobs.run_job(job)
+        self.assertEqual(requeued, [0])
+        self.assertEqual(job.status, 'DONE')
@@ -10,6 +10,7 @@ urlpatterns = [
     # Employee Management
     path('employees/', views.employee_list, name='employee_list'),
     path('employees/add/', views.employee_add, name='employee_add'),
+    path('employees/search/', views.employee_autocomplete, name='employee_autocomplete'),
     path('employees/<int:employee_id>/', views.employee_detail, name='employee_detail'),
     path('employees/<int:employee_id>/edit/', views.employee_edit, name='employee_edit'),
     path('employees/<int:employee_id>/delete/', views.employee_delete, name='employee_delete'),
@@ -17,17 +18,24 @@ urlpatterns = [
     # Attendance
     path('attendance/', views.attendance_view, name='attendance_view'),
     path('attendance/report/', views.attendance_report, name='attendance_report'),
+    path('attendance/punches/', views.punch_ingest, name='punch_ingest'),
     path('attendance/calendar/<int:year>/<int:month>/', views.attendance_calendar, name='attendance_calendar'),
     path('attendance/calendar/', views.attendance_calendar, name='attendance_calendar_current'),
+    path('attendance/heatmap/<int:department_id>/', views.attendance_heatmap, name='attendance_heatmap'),
     
     # Leave Management
     path('leaves/', views.leave_list, name='leave_list'),
     path('leaves/request/', views.leave_request, name='leave_request'),
     path('leaves/<int:leave_id>/approve/', views.leave_approve, name='leave_approve'),
+    path('leaves/bulk/', views.leave_bulk_decide, name='leave_bulk_decide'),
     
     # Salary & Payroll
     path('salary-structure/', views.salary_structure, name='salary_structure'),
     path('payroll/process/', views.payroll_processing, name='payroll_processing'),
+    path('payroll/jobs/<int:job_id>/status/', views.payroll_job_status, name='payroll_job_status'),
+    path('payroll/jobs/<int:job_id>/retry/', views.payroll_job_retry, name='payroll_job_retry'),
+    path('payroll/<int:payroll_month_id>/neft/', views.payroll_neft_export, name='payroll_neft_export'),
+    path('payroll/<int:payroll_month_id>/slips.zip', views.payroll_slips_zip, name='payroll_slips_zip'),
     path('payroll/records/', views.payroll_records, name='payroll_records'),
     path('payroll/salary-slip/<int:slip_id>/', views.salary_slip_view, name='salary_slip_view'),
 ]
@@ -1,19 +1,44 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Sum, Count
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
+from django.db.models import Sum, Count
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
-from datetime import datetime, timedelta
+from django.urls import reverse, reverse_lazy
+from django.utils.text import slugify
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
+from collections import Counter
+from datetime import datetime
+import hmac
+import json
 from calendar import monthcalendar, month_name
 import calendar
 
 from .models import (
     Employee, Attendance, Leave, SalaryStructure, PayrollMonth, 
-    PayrollRecord, SalarySlip, Department, Deduction, HolidayCalendar
+    PayrollRecord, Department, Deduction, HolidayCalendar, PayrollJob,
+    AttendanceMonthlySummary, AttendanceAnomaly, LeaveBalance
 )
+from . import workdays
+from .attendance import (
+    REPORT_ORDERING, day_status_counts, department_heatmap, mark_attendance,
+    month_statuses, status_counts_between, stream_attendance_csv
+)
+from .exports import NEFT_FORMATS, PAYABLE_STATUSES, stream_neft
+from .hours import hours_between
+from .jobs import retry_job, submit_payroll_job
+from .leaves import (
+    DECISIONS, LEAVE_ORDERING, LEAVE_PAGE_SIZE, balances_for, decide_leaves, leave_conflicts, leave_days,
+    overlapping_leaves
+)
+from .pagination import keyset_page
+from .payroll import get_payroll_month, month_key, parse_month
+from .punches import PUNCH_FORMATS, ingest_punches, read_punches
+from .search import autocomplete, search_employees
+from .slips import SlipRenderError, cached_slip_pdf, month_slips, slip_queryset, stream_slip_zip
 
 # ============= DASHBOARD VIEWS =============
 
@@ -35,20 +60,11 @@ def employee_dashboard(request):
     try:
         employee = Employee.objects.get(user=request.user)
         
-        # Current month attendance
+        # Current month attendance summary
         today = datetime.now()
-        current_month_start = today.replace(day=1)
-        current_month_end = (current_month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        attendance_records = Attendance.objects.filter(
-            employee=employee,
-            date__range=[current_month_start, current_month_end]
-        )
-        
-        # Attendance summary
-        present_count = attendance_records.filter(status='P').count()
-        absent_count = attendance_records.filter(status='A').count()
-        leave_count = attendance_records.filter(status='L').count()
+        summary = AttendanceMonthlySummary.objects.filter(
+            employee=employee, month=month_key(today)
+        ).first() or AttendanceMonthlySummary(employee=employee)
         
         # Recent payroll
         payroll_records = PayrollRecord.objects.filter(employee=employee).order_by('-payroll_month')[:3]
@@ -57,11 +73,12 @@ def employee_dashboard(request):
         pending_leaves = Leave.objects.filter(employee=employee, status='P')
         
         context = {
+            'leave_balances': balances_for(employee),
             'employee': employee,
-            'present_count': present_count,
-            'absent_count': absent_count,
-            'leave_count': leave_count,
-            'total_attendance': attendance_records.count(),
+            'present_count': summary.present_days,
+            'absent_count': summary.absent_days,
+            'leave_count': summary.leave_days,
+            'total_attendance': summary.total_days,
             'payroll_records': payroll_records,
             'pending_leaves': pending_leaves,
         }
@@ -81,9 +98,9 @@ def admin_dashboard(request):
     
     # Today's attendance
     today = datetime.now().date()
-    today_attendance = Attendance.objects.filter(date=today)
-    present_today = today_attendance.filter(status='P').count()
-    absent_today = today_attendance.filter(status='A').count()
+    today_counts = day_status_counts(today)
+    present_today = today_counts['P']
+    absent_today = today_counts['A']
     
     # Pending leaves
     pending_leaves = Leave.objects.filter(status='P').count()
@@ -91,6 +108,18 @@ def admin_dashboard(request):
     # Recent payrolls
     payroll_months = PayrollMonth.objects.order_by('-year', '-month')[:5]
     
+    # Latest attendance anomaly report, counted by kind
+    anomaly_month = AttendanceAnomaly.objects.order_by('-month').values_list('month', flat=True).first()
+    anomaly_counts = []
+    if anomaly_month:
+        counts = dict(
+            AttendanceAnomaly.objects.filter(month=anomaly_month)
+            .values_list('kind').annotate(total=Count('id')).order_by()
+        )
+        anomaly_counts = [
+            (kind, label, counts.get(kind, 0)) for kind, label in AttendanceAnomaly.KIND_CHOICES
+        ]
+    
     context = {
         'total_employees': total_employees,
         'total_departments': total_departments,
@@ -98,6 +127,8 @@ def admin_dashboard(request):
         'absent_today': absent_today,
         'pending_leaves': pending_leaves,
         'payroll_months': payroll_months,
+        'anomaly_month': anomaly_month,
+        'anomaly_counts': anomaly_counts,
     }
     return render(request, 'gate/admin_dashboard.html', context)
 
@@ -125,12 +156,7 @@ def employee_list(request):
     # Search
     search = request.GET.get('search')
     if search:
-        employees = employees.filter(
-            Q(employee_id__icontains=search) |
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search)
-        )
+        employees = search_employees(employees, search)
     
     departments = Department.objects.all()
     context = {
@@ -140,6 +166,24 @@ def employee_list(request):
     return render(request, 'gate/employee_list.html', context)
 
 
+@login_required
+def employee_autocomplete(request):
+    """Best matching active employees for a partial name or ID, as JSON"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'status': 'error', 'message': 'Not authorized'}, status=403)
+    
+    results = [
+        {
+            'id': employee.id,
+            'employee_id': employee.employee_id,
+            'name': employee.full_name,
+            'department': employee.department.name if employee.department else None,
+        }
+        for employee in autocomplete(request.GET.get('q', ''))
+    ]
+    return JsonResponse({'results': results})
+
+
 @login_required
 def employee_detail(request, employee_id):
     """Employee details view"""
@@ -340,19 +384,7 @@ def attendance_view(request):
             return redirect('attendance_view')
         
         # Process bulk attendance submission
-        for employee_id, status in attendance_data.items():
-            try:
-                employee = Employee.objects.get(pk=employee_id)
-                attendance, created = Attendance.objects.update_or_create(
-                    employee=employee,
-                    date=today,
-                    defaults={'status': status}
-                )
-                success_count += 1
-            except Employee.DoesNotExist:
-                error_count += 1
-            except Exception as e:
-                error_count += 1
+        success_count, error_count = mark_attendance(today, attendance_data)
         
         # Return JSON response for AJAX requests
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -364,43 +396,78 @@ def attendance_view(request):
         return redirect('attendance_view')
     
     employees = Employee.objects.filter(status='A')
-    today_attendance = Attendance.objects.filter(date=today)
     
     # Get IDs of employees marked as present
-    marked_employees = list(today_attendance.filter(status='P').values_list('employee_id', flat=True))
-    
-    # Count attendance by status
-    attendance_counts = {
-        'P': today_attendance.filter(status='P').count(),
-        'A': today_attendance.filter(status='A').count(),
-        'L': today_attendance.filter(status='L').count(),
-        'H': today_attendance.filter(status='H').count(),
-    }
+    marked_employees = list(
+        Attendance.objects.filter(date=today, status='P').values_list('employee_id', flat=True)
+    )
+    
+    # Count attendance by status, from the per-day counter cache
+    today_counts = day_status_counts(today)
+    attendance_counts = {status: today_counts[status] for status in ['P', 'A', 'L', 'H']}
     
     context = {
         'employees': employees,
         'today': today,
-        'today_attendance': today_attendance,
+        'marked_count': today_counts['total'],
         'marked_employees': marked_employees,
         'attendance_counts': attendance_counts,
     }
     return render(request, 'gate/attendance.html', context)
 
 
+def _punch_device(request):
+    """Whether the request carries the GATE_PUNCH_API_KEY device token"""
+    api_key = getattr(settings, 'GATE_PUNCH_API_KEY', '')
+    token = request.headers.get('Authorization', '')
+    return bool(api_key) and hmac.compare_digest(token.encode(), f"Token {api_key}".encode())
+
+
+def _csrf_passes(request):
+    """Run the CSRF check a csrf_exempt view skipped"""
+    check = CsrfViewMiddleware(lambda request: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {}) is None
+
+
+@csrf_exempt
+def punch_ingest(request):
+    """Accept a batch of device punches as JSON lines or CSV and fold them into attendance
+
+    Devices authenticate with the GATE_PUNCH_API_KEY token and skip CSRF;
+    staff sessions may post too, but only with a valid CSRF token.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+    if not _punch_device(request):
+        if not (request.user.is_authenticated and request.user.is_staff):
+            return JsonResponse({'status': 'error', 'message': 'Not authorized'}, status=403)
+        if not _csrf_passes(request):
+            return JsonResponse({'status': 'error', 'message': 'CSRF verification failed'}, status=403)
+    
+    fmt = request.GET.get('format')
+    if fmt not in PUNCH_FORMATS:
+        fmt = 'csv' if request.content_type == 'text/csv' else 'jsonl'
+    
+    lines = (line.decode('utf-8', 'replace') for line in request)
+    result = ingest_punches(read_punches(lines, fmt))
+    return JsonResponse({'status': 'success', **result.as_dict()})
+
+
 @login_required
 def attendance_report(request):
     """View attendance report for a range"""
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    employee_filter = request.GET.get('employee')
+    
+    # Employees only ever see their own attendance
     if not (request.user.is_staff or request.user.is_superuser):
         try:
-            employee = Employee.objects.get(user=request.user)
-            return attendance_report_employee(request, employee.id)
+            employee_filter = str(Employee.objects.get(user=request.user).id)
         except Employee.DoesNotExist:
             return redirect('employee_dashboard')
     
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    employee_filter = request.GET.get('employee')
-    
     attendance_records = Attendance.objects.select_related('employee').all()
     
     if start_date:
@@ -410,15 +477,58 @@ def attendance_report(request):
     if employee_filter:
         attendance_records = attendance_records.filter(employee_id=employee_filter)
     
-    attendance_records = attendance_records.order_by('-date')
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(
+            stream_attendance_csv(attendance_records, REPORT_ORDERING), content_type='text/csv'
+        )
+        response['Content-Disposition'] = 'attachment; filename="attendance-report.csv"'
+        return response
+    
+    page = keyset_page(attendance_records, REPORT_ORDERING, request.GET.get('cursor'))
+    
+    # Filters without the page cursor, for the export and next-page links
+    filters = request.GET.copy()
+    filters.pop('cursor', None)
+    filters.pop('format', None)
     
     employees = Employee.objects.filter(status='A')
     
+    # Working days and status totals in the selected range
+    working_days = None
+    status_totals = None
+    hours_totals = None
+    if start_date and end_date:
+        try:
+            range_start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            range_end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            range_start = range_end = None
+        if range_start and range_end and range_start <= range_end:
+            working_days = workdays.working_days_between(range_start, range_end)
+            employee_ids = [employee_filter] if employee_filter else None
+            counts = status_counts_between(range_start, range_end, employee_ids)
+            status_totals = [
+                (label, counts[code]) for code, label in Attendance.STATUS_CHOICES
+            ]
+            minutes = Counter()
+            for totals in hours_between(range_start, range_end, employee_ids).values():
+                minutes.update(totals)
+            hours_totals = [
+                ('Worked Hours', round(minutes['worked_minutes'] / 60, 1)),
+                ('Overtime Hours', round(minutes['overtime_minutes'] / 60, 1)),
+                ('Late Arrivals', minutes['late_days']),
+            ]
+    
     context = {
-        'attendance_records': attendance_records,
+        'attendance_records': page.items,
+        'page': page,
+        'filters': filters.urlencode(),
         'employees': employees,
         'start_date': start_date,
         'end_date': end_date,
+        'working_days': working_days,
+        'status_totals': status_totals,
+        'hours_totals': hours_totals,
     }
     return render(request, 'gate/attendance_report.html', context)
 
@@ -439,7 +549,26 @@ def leave_request(request):
         end_date = request.POST.get('end_date')
         reason = request.POST.get('reason')
         
-        Leave.objects.create(
+        from django.contrib import messages
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            messages.error(request, 'Please enter valid start and end dates.')
+            return redirect('leave_request')
+        if end < start:
+            messages.error(request, 'End date cannot be before start date.')
+            return redirect('leave_request')
+        clash = overlapping_leaves(employee.pk, start, end).first()
+        if clash:
+            messages.error(
+                request,
+                f'You already have a {clash.get_status_display().lower()} leave from '
+                f'{clash.start_date} to {clash.end_date} overlapping these dates.'
+            )
+            return redirect('leave_request')
+        
+        leave = Leave.objects.create(
             employee=employee,
             leave_type=leave_type,
             start_date=start_date,
@@ -448,27 +577,90 @@ def leave_request(request):
             status='P'
         )
         
+        balance = LeaveBalance.objects.filter(
+            employee=employee, leave_type=leave_type
+        ).values_list('balance', flat=True).first() or 0
+        days = leave_days(leave)
+        if leave_type != 'UL' and days > balance:
+            messages.warning(
+                request, f'This request is for {days} working day(s) but your balance is {balance}.'
+            )
+        
         return redirect('leave_list')
     
     context = {
         'leave_types': Leave._meta.get_field('leave_type').choices,
+        'balances': balances_for(employee),
     }
     return render(request, 'gate/leave_request.html', context)
 
 
 @login_required
 def leave_list(request):
-    """View leaves"""
+    """View leaves, newest first, one keyset page at a time"""
+    is_staff = request.user.is_staff or request.user.is_superuser
     try:
         employee = Employee.objects.get(user=request.user)
-        leaves = employee.leaves.all().order_by('-start_date')
+        leaves = employee.leaves.all()
     except Employee.DoesNotExist:
-        if not (request.user.is_staff or request.user.is_superuser):
+        if not is_staff:
             return redirect('login')
-        leaves = Leave.objects.all().order_by('-start_date')
+        leaves = Leave.objects.all()
+    leaves = leaves.select_related('employee', 'approved_by')
+    
+    status = request.GET.get('status')
+    if status:
+        leaves = leaves.filter(status=status)
+    leave_type = request.GET.get('leave_type')
+    if leave_type:
+        leaves = leaves.filter(leave_type=leave_type)
+    department = request.GET.get('department')
+    if department and department.isdigit() and is_staff:
+        leaves = leaves.filter(department_id=department)
+    
+    page = keyset_page(leaves, LEAVE_ORDERING, request.GET.get('cursor'), LEAVE_PAGE_SIZE)
+    if is_staff:
+        # Conflicts of every pending leave on the page, found in one batch
+        conflicts = leave_conflicts(leave for leave in page.items if leave.status == 'P')
+        for leave in page.items:
+            leave.conflicts = conflicts.get(leave.pk)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'leaves': [
+                {
+                    'id': leave.pk,
+                    'employee': {
+                        'id': leave.employee_id,
+                        'employee_id': leave.employee.employee_id,
+                        'name': leave.employee.full_name,
+                    },
+                    'leave_type': leave.leave_type,
+                    'start_date': leave.start_date.isoformat(),
+                    'end_date': leave.end_date.isoformat(),
+                    'days': leave.number_of_days,
+                    'status': leave.status,
+                    'approved_by': leave.approved_by.username if leave.approved_by else None,
+                    'approval_date': leave.approval_date.isoformat() if leave.approval_date else None,
+                    'conflict': bool(getattr(leave, 'conflicts', None)),
+                }
+                for leave in page.items
+            ],
+            'next_cursor': page.next_cursor or None,
+        })
+    
+    # Filters without the page cursor, for the next-page links
+    filters = request.GET.copy()
+    filters.pop('cursor', None)
+    filters.pop('format', None)
     
     context = {
-        'leaves': leaves,
+        'leaves': page.items,
+        'page': page,
+        'filters': filters.urlencode(),
+        'status_choices': Leave.STATUS_CHOICES,
+        'leave_types': Leave.LEAVE_TYPE_CHOICES,
+        'departments': Department.objects.all() if is_staff else [],
     }
     return render(request, 'gate/leave_list.html', context)
 
@@ -480,10 +672,19 @@ def leave_approve(request, leave_id):
         return redirect('leave_list')
     
     leave = get_object_or_404(Leave, pk=leave_id)
+    conflicts = leave_conflicts([leave]).get(leave.pk)
     
     if request.method == 'POST':
         action = request.POST.get('action')
         if action == 'approve':
+            if conflicts:
+                from django.contrib import messages
+                if conflicts.leaves:
+                    messages.error(request, 'This leave overlaps an approved leave of the same employee.')
+                else:
+                    messages.error(request, 'Attendance is already marked within this leave. '
+                                            'Correct the attendance or the leave dates first.')
+                return redirect('leave_approve', leave_id=leave.pk)
             leave.status = 'A'
         elif action == 'reject':
             leave.status = 'R'
@@ -494,12 +695,66 @@ def leave_approve(request, leave_id):
         
         return redirect('leave_list')
     
+    balance = LeaveBalance.objects.filter(
+        employee_id=leave.employee_id, leave_type=leave.leave_type
+    ).values_list('balance', flat=True).first() or 0
+    
     context = {
         'leave': leave,
+        'leave_days': leave_days(leave),
+        'balance': balance,
+        'conflicts': conflicts,
     }
     return render(request, 'gate/leave_approve.html', context)
 
 
+@login_required
+def leave_bulk_decide(request):
+    """Approve or reject many pending leaves in one transaction
+
+    Takes a form with ``leave_ids`` and ``action``, or a JSON body
+    ``{"ids": [...], "action": "approve" | "reject"}`` answered with the
+    per-ID results as JSON.
+    """
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect('leave_list')
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+    
+    wants_json = request.content_type == 'application/json'
+    if wants_json:
+        try:
+            payload = json.loads(request.body)
+            action, leave_ids = payload.get('action'), payload.get('ids') or []
+        except (ValueError, AttributeError):
+            return JsonResponse({'status': 'error', 'message': 'Invalid JSON body'}, status=400)
+    else:
+        action, leave_ids = request.POST.get('action'), request.POST.getlist('leave_ids')
+    try:
+        leave_ids = [int(leave_id) for leave_id in leave_ids]
+    except (TypeError, ValueError):
+        leave_ids = None
+    if action not in DECISIONS or leave_ids is None:
+        if wants_json:
+            return JsonResponse({'status': 'error', 'message': 'Invalid action or IDs'}, status=400)
+        return redirect('leave_list')
+    
+    results = decide_leaves(leave_ids, action, request.user)
+    decided = sum(1 for result in results if result['result'] != 'skipped')
+    if wants_json:
+        return JsonResponse({'status': 'success', 'decided': decided, 'results': results})
+    
+    from django.contrib import messages
+    verb = 'approved' if action == 'approve' else 'rejected'
+    messages.success(request, f'{decided} leave request(s) {verb}.')
+    skipped = [result for result in results if result['result'] == 'skipped']
+    if skipped:
+        messages.warning(request, f'{len(skipped)} skipped: ' + '; '.join(
+            f"#{result['id']} {result['detail']}" for result in skipped[:10]
+        ))
+    return redirect('leave_list')
+
+
 # ============= SALARY & PAYROLL =============
 
 @login_required
@@ -558,89 +813,68 @@ def payroll_processing(request):
         month_str = str(month).zfill(2)
         year_int = int(year)
         
-        # Create or get payroll month
-        payroll_month, created = PayrollMonth.objects.get_or_create(
-            month=f"{year_int}-{month_str}",
-            year=year_int,
-            defaults={'status': 'DRAFT'}
+        payroll_month = get_payroll_month(year_int, int(month_str))
+        job = submit_payroll_job(
+            payroll_month,
+            user=request.user,
+            full_run=request.POST.get('full_run') == 'on',
         )
         
-        # Process payroll for all employees
-        employees = Employee.objects.filter(status='A')
-        
-        for employee in employees:
-            try:
-                salary_structure = employee.salary_structure
-            except SalaryStructure.DoesNotExist:
-                continue
-            
-            # Get attendance data
-            month_start = datetime(int(year), int(month), 1).date()
-            if int(month) == 12:
-                month_end = datetime(int(year) + 1, 1, 1).date() - timedelta(days=1)
-            else:
-                month_end = datetime(int(year), int(month) + 1, 1).date() - timedelta(days=1)
-            
-            attendance_records = Attendance.objects.filter(
-                employee=employee,
-                date__range=[month_start, month_end]
-            )
-            
-            present_days = attendance_records.filter(status='P').count()
-            absent_days = attendance_records.filter(status='A').count()
-            leave_days = attendance_records.filter(status__in=['L', 'ML', 'PL']).count()
-            
-            # Calculate salary
-            working_days = 22  # Default working days
-            
-            payroll_record, created = PayrollRecord.objects.update_or_create(
-                employee=employee,
-                payroll_month=payroll_month,
-                defaults={
-                    'working_days': working_days,
-                    'present_days': present_days,
-                    'absent_days': absent_days,
-                    'leave_days': leave_days,
-                    'basic_salary': salary_structure.basic_salary,
-                    'hra': salary_structure.hra,
-                    'dearness_allowance': salary_structure.dearness_allowance,
-                    'conveyance': salary_structure.conveyance,
-                    'medical_allowance': salary_structure.medical_allowance,
-                    'other_allowances': salary_structure.other_allowances,
-                    'pf_contribution': salary_structure.pf_contribution,
-                    'esi_contribution': salary_structure.esi_contribution,
-                    'income_tax': salary_structure.income_tax,
-                    'other_deductions': salary_structure.other_deductions,
-                }
-            )
-            
-            payroll_record.calculate_salary()
-            payroll_record.save()
-            
-            # Create salary slip
-            slip_number = f"SLIP-{payroll_month.month}-{employee.employee_id}"
-            SalarySlip.objects.get_or_create(
-                payroll_record=payroll_record,
-                defaults={'slip_number': slip_number}
-            )
-        
-        payroll_month.status = 'PROCESSED'
-        payroll_month.processing_date = datetime.now()
-        payroll_month.processed_by = request.user
-        payroll_month.save()
+        from django.contrib import messages
+        messages.info(request, f'Payroll for {payroll_month.month} has been queued.')
         
-        return redirect('payroll_records')
+        return redirect(f"{reverse('payroll_processing')}?job={job.id}")
+    
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = PayrollJob.objects.select_related('payroll_month').filter(pk=job_id).first()
     
     context = {
         'months': range(1, 13),
         'current_year': datetime.now().year,
+        'job': job,
     }
     return render(request, 'gate/payroll_processing.html', context)
 
 
+@login_required
+def payroll_job_status(request, job_id):
+    """Progress of a queued payroll run as JSON"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    job = get_object_or_404(PayrollJob.objects.select_related('payroll_month'), pk=job_id)
+    return JsonResponse({
+        'id': job.id,
+        'month': job.payroll_month.month,
+        'payroll_month_id': job.payroll_month_id,
+        'status': job.status,
+        'processed': job.processed,
+        'total': job.total,
+        'percent': job.percent,
+        'attempts': job.attempts,
+        'result': job.result,
+        'failed': job.status == 'FAILED',
+    })
+
+
+@login_required
+def payroll_job_retry(request, job_id):
+    """Queue a failed payroll run again"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect('employee_dashboard')
+    
+    job = get_object_or_404(PayrollJob, pk=job_id)
+    if request.method == 'POST':
+        retry_job(job)
+    return redirect(f"{reverse('payroll_processing')}?job={job.id}")
+
+
 @login_required
 def payroll_records(request):
     """View payroll records"""
+    selected_month = None
     if not (request.user.is_staff or request.user.is_superuser):
         try:
             employee = Employee.objects.get(user=request.user)
@@ -653,6 +887,8 @@ def payroll_records(request):
         
         if payroll_month:
             payroll_records = payroll_records.filter(payroll_month_id=payroll_month)
+            if payroll_month.isdigit():
+                selected_month = PayrollMonth.objects.filter(pk=payroll_month).first()
         
         payroll_records = payroll_records.order_by('-payroll_month')
     
@@ -661,14 +897,63 @@ def payroll_records(request):
     context = {
         'payroll_records': payroll_records,
         'payroll_months': payroll_months,
+        'selected_month': selected_month,
+        'payable_statuses': PAYABLE_STATUSES,
+        'departments': Department.objects.all() if selected_month else [],
     }
     return render(request, 'gate/payroll_records.html', context)
 
 
+@login_required
+def payroll_neft_export(request, payroll_month_id):
+    """Stream the bank transfer (NEFT) file for an approved payroll month"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect('employee_dashboard')
+    
+    payroll_month = get_object_or_404(PayrollMonth, pk=payroll_month_id)
+    if payroll_month.status not in PAYABLE_STATUSES:
+        from django.contrib import messages
+        messages.error(request, f'Payroll {payroll_month.month} must be approved before exporting payouts.')
+        return redirect(f"{reverse('payroll_records')}?payroll_month={payroll_month.id}")
+    
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in NEFT_FORMATS:
+        fmt = 'csv'
+    extension = 'csv' if fmt == 'csv' else 'txt'
+    content_type = 'text/csv' if fmt == 'csv' else 'text/plain'
+    
+    response = StreamingHttpResponse(stream_neft(payroll_month, fmt), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="neft-{payroll_month.month}.{extension}"'
+    return response
+
+
+@login_required
+def payroll_slips_zip(request, payroll_month_id):
+    """Stream a zip of every salary slip for a payroll month, optionally one department"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect('employee_dashboard')
+    
+    payroll_month = get_object_or_404(PayrollMonth, pk=payroll_month_id)
+    department = None
+    department_id = request.GET.get('department')
+    if department_id:
+        department = get_object_or_404(Department, pk=department_id)
+    
+    filename = f"salary-slips-{payroll_month.month}"
+    if department:
+        filename += f"-{slugify(department.name)}"
+    response = StreamingHttpResponse(
+        stream_slip_zip(month_slips(payroll_month, department)),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.zip"'
+    return response
+
+
 @login_required
 def salary_slip_view(request, slip_id):
     """View salary slip"""
-    salary_slip = get_object_or_404(SalarySlip, pk=slip_id)
+    salary_slip = get_object_or_404(slip_queryset(), pk=slip_id)
     payroll_record = salary_slip.payroll_record
     employee = payroll_record.employee
     
@@ -681,6 +966,23 @@ def salary_slip_view(request, slip_id):
         if not request.user.is_staff:
             return redirect('login')
     
+    if request.GET.get('format') == 'pdf':
+        try:
+            path = cached_slip_pdf(salary_slip)
+        except SlipRenderError:
+            from django.contrib import messages
+            messages.warning(
+                request,
+                'This slip uses characters the PDF download cannot show. '
+                'Use Print to save it as a PDF instead.',
+            )
+        else:
+            return FileResponse(
+                open(path, 'rb'),
+                content_type='application/pdf',
+                filename=f"{salary_slip.slip_number}.pdf",
+            )
+    
     context = {
         'salary_slip': salary_slip,
         'payroll_record': payroll_record,
@@ -691,6 +993,26 @@ def salary_slip_view(request, slip_id):
 
 # ============= UTILITY FUNCTIONS =============
 
+@login_required
+def attendance_heatmap(request, department_id):
+    """Employees x days attendance matrix of a department for a month, as JSON"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'status': 'error', 'message': 'Not authorized'}, status=403)
+    
+    department = get_object_or_404(Department, pk=department_id)
+    month = request.GET.get('month')
+    if month:
+        try:
+            year, month = parse_month(month)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    else:
+        today = datetime.now()
+        year, month = today.year, today.month
+    
+    return JsonResponse(department_heatmap(department, year, month))
+
+
 @login_required
 def attendance_calendar(request, year=None, month=None):
     """Display attendance calendar"""
@@ -706,18 +1028,8 @@ def attendance_calendar(request, year=None, month=None):
         month = today.month
     
     # Get attendance for the month
-    start_date = datetime(year, month, 1).date()
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-    else:
-        end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    
-    attendance_records = Attendance.objects.filter(
-        employee=employee,
-        date__range=[start_date, end_date]
-    ).values('date', 'status')
-    
-    attendance_dict = {rec['date']: rec['status'] for rec in attendance_records}
+    attendance_dict = month_statuses(employee, year, month)
+    company_holidays = workdays.holidays()
     
     # Build calendar
     cal = monthcalendar(year, month)
@@ -735,6 +1047,8 @@ def attendance_calendar(request, year=None, month=None):
                     'day': day,
                     'status': status,
                     'date': date_obj,
+                    'is_working_day': workdays.is_working_day(date_obj),
+                    'holiday': company_holidays.get(date_obj),
                 })
         calendar_data.append(week_data)
     
@@ -744,6 +1058,7 @@ def attendance_calendar(request, year=None, month=None):
         'month': month,
         'month_name': month_name[month],
         'calendar': calendar_data,
+        'working_days': workdays.working_days(year, month),
         'status_choices': Attendance._meta.get_field('status').choices,
     }
     return render(request, 'gate/attendance_calendar.html', context)
@@ -0,0 +1,109 @@
+import calendar
+import threading
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import HolidayCalendar
+
+# Weekday numbers (Monday is 0) that are off every week unless overridden in settings
+DEFAULT_WEEKLY_OFFS = [6]
+
+# Every process memoizes the holidays. Before trusting its memo it compares,
+# at most once every VERSION_CHECK_SECONDS, the calendar's latest update and
+# row count with those it loaded, so changes made in other processes show up.
+VERSION_CHECK_SECONDS = 5
+
+_lock = threading.Lock()
+_holidays = None  # {date: name} for every HolidayCalendar entry
+_masks = {}  # {(year, month): bitmap with bit (day - 1) set for working days}
+_version = None  # (latest updated_at, row count) of the calendar when the memo was loaded
+_checked_at = None  # time.monotonic() of the last version lookup
+
+
+def weekly_offs():
+    """Weekly off weekdays from the GATE_WEEKLY_OFFS setting"""
+    return set(getattr(settings, 'GATE_WEEKLY_OFFS', DEFAULT_WEEKLY_OFFS))
+
+
+def clear():
+    """Drop this process's memoized holidays and month bitmaps"""
+    global _holidays, _checked_at
+    with _lock:
+        _holidays = None
+        _masks.clear()
+        _checked_at = None
+
+
+def _check_version():
+    """Drop the memo if the calendar changed since it was loaded, anywhere"""
+    global _holidays, _version, _checked_at
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < VERSION_CHECK_SECONDS:
+        return
+    version = tuple(HolidayCalendar.objects.aggregate(Max('updated_at'), Count('id')).values())
+    with _lock:
+        if version != _version:
+            _holidays = None
+            _masks.clear()
+            _version = version
+        _checked_at = now
+
+
+def holidays():
+    """All company holidays keyed by date, reloaded only after a change"""
+    global _holidays
+    _check_version()
+    if _holidays is None:
+        with _lock:
+            if _holidays is None:
+                _holidays = dict(HolidayCalendar.objects.values_list('date', 'name'))
+    return _holidays
+
+
+def working_day_mask(year, month):
+    """Bitmap of the working days of a month, bit 0 being the 1st"""
+    _check_version()
+    key = (year, month)
+    mask = _masks.get(key)
+    if mask is None:
+        offs = weekly_offs()
+        company_holidays = holidays()
+        first_weekday, days_in_month = calendar.monthrange(year, month)
+        mask = 0
+        for day in range(days_in_month):
+            if (first_weekday + day) % 7 in offs:
+                continue
+            if date(year, month, day + 1) in company_holidays:
+                continue
+            mask |= 1 << day
+        _masks[key] = mask
+    return mask
+
+
+def working_days(year, month):
+    """Number of working days in a month"""
+    return working_day_mask(year, month).bit_count()
+
+
+def is_working_day(day):
+    """Whether a date is neither a weekly off nor a holiday"""
+    return bool(working_day_mask(day.year, day.month) >> (day.day - 1) & 1)
+
+
+def working_days_between(start_date, end_date):
+    """Number of working days in an inclusive date range"""
+    total = 0
+    current = start_date.replace(day=1)
+    while current <= end_date:
+        mask = working_day_mask(current.year, current.month)
+        days_in_month = calendar.monthrange(current.year, current.month)[1]
+        first = start_date.day if (current.year, current.month) == (start_date.year, start_date.month) else 1
+        last = end_date.day if (current.year, current.month) == (end_date.year, end_date.month) else days_in_month
+        # Keep only the bits for days first..last
+        total += (mask >> (first - 1) & ((1 << (last - first + 1)) - 1)).bit_count()
+        current = current.replace(day=days_in_month) + timedelta(days=1)
+    return total
+
@@ -0,0 +1,40 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Nothing here imports models: spawned workers unpickle init_worker, and so
+# import this module, before Django is set up.
+
+
+def init_worker(database=None, values=None):
+    """Set up Django in pool workers started with the spawn method
+
+    ``database`` holds the parent's default connection settings, so workers
+    read the database it uses even when that was switched at runtime (as the
+    test runner does); ``values`` carries the parent's current value of
+    settings the work depends on, for the same reason.
+    """
+    import django
+    django.setup()
+    if database is not None:
+        from django.db import connections
+        connections['default'].settings_dict.update(database)
+    if values:
+        from django.conf import settings
+        for name, value in values.items():
+            setattr(settings, name, value)
+
+
+def process_pool(workers, setting_names=()):
+    """Process pool of fresh interpreters sharing the current default database
+
+    Spawned rather than forked, so no worker inherits an open connection.
+    Settings named in ``setting_names`` take the parent's current values.
+    """
+    from django.conf import settings
+    from django.db import connection
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(dict(connection.settings_dict), {name: getattr(settings, name) for name in setting_names}),
+    )